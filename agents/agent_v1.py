@@ -9,74 +9,106 @@ IMPORTANT:
   Claude Desktop est connecté, mais évite de faire 10 runs simultanés.
 """
 
-import json
+import itertools
 import subprocess
 from typing import Dict, Any, List, Tuple
 
+try:
+    import orjson
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    loads = orjson.loads
+except ImportError:
+    from json import dumps, loads
+
 MCP_CMD = ["python", "mcp_server.py"]
 
 
 def send(proc, payload: Dict[str, Any]) -> Dict[str, Any]:
-    proc.stdin.write(json.dumps(payload) + "\n")
+    return send_line(proc, dumps(payload) + "\n")
+
+
+def send_line(proc, line: str) -> Dict[str, Any]:
+    proc.stdin.write(line)
     proc.stdin.flush()
     line = proc.stdout.readline()
     if not line:
         raise RuntimeError("No response from MCP server")
-    return json.loads(line)
+    return loads(line)
+
+
+# Only id, tool name and arguments vary between tools/call requests.
+_TOOL_CALL_TMPL = '{{"jsonrpc":"2.0","id":{id},"method":"tools/call","params":{{"name":"{name}","arguments":{args}}}}}\n'
 
 
 def call_tool(proc, _id: int, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
-    return send(
-        proc,
-        {
-            "jsonrpc": "2.0",
-            "id": _id,
-            "method": "tools/call",
-            "params": {"name": name, "arguments": arguments},
-        },
-    )
+    return send_line(proc, _TOOL_CALL_TMPL.format(id=_id, name=name, args=dumps(arguments)))
 
 
 def content_text(resp: Dict[str, Any]) -> str:
     return resp["result"]["content"][0]["text"]
 
 
-def chair_plan() -> List[Tuple[str, List[float], List[float]]]:
-    """
-    Returns list of (name, location, scale).
-    Dimensions are simplistic and deterministic.
-    """
-    seat_loc = [0.0, 0.0, 0.45]
-    seat_sca = [0.9, 0.9, 0.08]
-
-    back_loc = [0.0, -0.38, 0.85]
-    back_sca = [0.9, 0.08, 0.8]
+# (name, location, scale) — dimensions are simplistic and deterministic.
+_LX = 0.40
+_LY = 0.40
+_LEG_Z = 0.22
+_LEG_SCA = (0.08, 0.08, 0.45)
 
+_CHAIR_PARTS: Tuple[Tuple[str, Tuple[float, float, float], Tuple[float, float, float]], ...] = (
+    ("Chair_Seat", (0.0, 0.0, 0.45), (0.9, 0.9, 0.08)),
+    ("Chair_Back", (0.0, -0.38, 0.85), (0.9, 0.08, 0.8)),
     # Legs at corners
-    lx = 0.40
-    ly = 0.40
-    leg_z = 0.22
-    leg_sca = [0.08, 0.08, 0.45]
-
-    legs = [
-        ("Chair_Leg_FL", [ lx,  ly, leg_z], leg_sca),
-        ("Chair_Leg_FR", [-lx,  ly, leg_z], leg_sca),
-        ("Chair_Leg_BL", [ lx, -ly, leg_z], leg_sca),
-        ("Chair_Leg_BR", [-lx, -ly, leg_z], leg_sca),
-    ]
-
-    parts = [
-        ("Chair_Seat", seat_loc, seat_sca),
-        ("Chair_Back", back_loc, back_sca),
-        *legs,
-    ]
-    return parts
+    ("Chair_Leg_FL", ( _LX,  _LY, _LEG_Z), _LEG_SCA),
+    ("Chair_Leg_FR", (-_LX,  _LY, _LEG_Z), _LEG_SCA),
+    ("Chair_Leg_BL", ( _LX, -_LY, _LEG_Z), _LEG_SCA),
+    ("Chair_Leg_BR", (-_LX, -_LY, _LEG_Z), _LEG_SCA),
+)
 
 
-def main():
-    print("[agent] starting agent_v1.1 (chair full)")
+def _part_ops(name: str, loc, sca) -> Tuple[Dict[str, Any], ...]:
+    return (
+        # Create cube at origin-ish (location will be set precisely after)
+        {
+            "op": "object.create_primitive",
+            "args": {"type": "cube", "name": name, "location": [0.0, 0.0, 0.0], "collection": "Chair"},
+        },
+        {
+            "op": "object.set_transform",
+            "args": {"name": name, "location": list(loc), "scale": list(sca), "rotation_euler": [0.0, 0.0, 0.0]},
+        },
+        {"op": "collection.link_object", "args": {"collection": "Chair", "object": name}},
+    )
+
 
-    proc = subprocess.Popen(
+# Whole build (collection + every part) in one world_mutate batch, built once at import.
+_CHAIR_BATCH: List[Dict[str, Any]] = [
+    {"op": "collection.create", "args": {"name": "Chair"}},
+    *itertools.chain.from_iterable(_part_ops(name, loc, sca) for name, loc, sca in _CHAIR_PARTS),
+]
+
+_CHAIR_MUTATE_ID = 3
+_CHAIR_MUTATE_LINE = _TOOL_CALL_TMPL.format(
+    id=_CHAIR_MUTATE_ID,
+    name="world_mutate",
+    args=dumps({"dsl_version": "1.0", "batch": _CHAIR_BATCH}),
+)
+
+
+def start_server():
+    # Reuse a running server daemon (python -m server.daemon) instead of spawning one.
+    try:
+        from server.daemon import connect
+    except ImportError:
+        connect = None
+    session = connect() if connect else None
+    if session is not None:
+        print("[agent] using server daemon")
+        return session
+
+    return subprocess.Popen(
         MCP_CMD,
         stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
@@ -85,6 +117,12 @@ def main():
         cwd=".",
     )
 
+
+def main():
+    print("[agent] starting agent_v1.1 (chair full)")
+
+    proc = start_server()
+
     try:
         # 0) initialize
         print("[agent] initialize")
@@ -98,94 +136,23 @@ def main():
             },
         )
 
-        # 1) reset world
+        # 1) reset world (its snapshot_id is the baseline)
         print("[agent] world_reset")
         r_reset = call_tool(proc, 2, "world_reset", {"seed": 0})
-        print("[agent] reset_out:", content_text(r_reset))
-
-        # 2) observe baseline (captures snapshot_id)
-        r_obs0 = call_tool(proc, 3, "world_observe", {"level": "compact"})
-        obs0_txt = content_text(r_obs0)
-        print("[agent] observe0:", obs0_txt)
-        obs0 = json.loads(obs0_txt)
-        s_before = obs0["snapshot_id"]
-
-        # 3) optional: create collection Chair
-        print("[agent] create collection Chair")
-        r_col = call_tool(
-            proc,
-            4,
-            "world_mutate",
-            {
-                "dsl_version": "1.0",
-                "batch": [
-                    {"op": "collection.create", "args": {"name": "Chair"}},
-                ],
-            },
-        )
-        col_txt = content_text(r_col)
-        print("[agent] mutate(collection):", col_txt)
-        s_after_col = json.loads(col_txt).get("snapshot_id")
-
-        # 4) build chair parts
-        parts = chair_plan()
-
-        batch: List[Dict[str, Any]] = []
-        for name, loc, sca in parts:
-            # Create cube at origin-ish (location will be set precisely after)
-            batch.append(
-                {
-                    "op": "object.create_primitive",
-                    "args": {
-                        "type": "cube",
-                        "name": name,
-                        "location": [0.0, 0.0, 0.0],
-                        "collection": "Chair",
-                    },
-                }
-            )
-            batch.append(
-                {
-                    "op": "object.set_transform",
-                    "args": {
-                        "name": name,
-                        "location": loc,
-                        "scale": sca,
-                        "rotation_euler": [0.0, 0.0, 0.0],
-                    },
-                }
-            )
-            batch.append(
-                {
-                    "op": "collection.link_object",
-                    "args": {"collection": "Chair", "object": name},
-                }
-            )
-
-        print(f"[agent] world_mutate (build chair parts: ops={len(batch)})")
-        r_mut = call_tool(
-            proc,
-            5,
-            "world_mutate",
-            {
-                "dsl_version": "1.0",
-                "batch": batch,
-            },
-        )
+        reset_txt = content_text(r_reset)
+        print("[agent] reset_out:", reset_txt)
+        s_before = loads(reset_txt)["snapshot_id"]
+
+        # 2) create collection Chair + build all parts in a single batch
+        print(f"[agent] world_mutate (build chair: ops={len(_CHAIR_BATCH)})")
+        r_mut = send_line(proc, _CHAIR_MUTATE_LINE)
         mut_txt = content_text(r_mut)
         print("[agent] mutate(build):", mut_txt)
-        s_after_build = json.loads(mut_txt)["snapshot_id"]
-
-        # 5) observe after build
-        r_obs1 = call_tool(proc, 6, "world_observe", {"level": "compact"})
-        obs1_txt = content_text(r_obs1)
-        print("[agent] observe1:", obs1_txt)
-        obs1 = json.loads(obs1_txt)
-        s_after_obs = obs1["snapshot_id"]
+        s_after_build = loads(mut_txt)["snapshot_id"]
 
-        # 6) diff from baseline to last observe
+        # 3) diff from baseline to the build snapshot
         print("[agent] world_observe_diff")
-        r_diff = call_tool(proc, 7, "world_observe_diff", {"from": s_before, "to": s_after_obs})
+        r_diff = call_tool(proc, 4, "world_observe_diff", {"from": s_before, "to": s_after_build})
         print("[agent] diff:", content_text(r_diff))
 
         print("[agent] DONE")
@@ -2,10 +2,18 @@
 from __future__ import annotations
 
 import json
+import struct
 import sys
-from typing import Any, Dict, List, Tuple
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import bpy
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # not bundled with Blender; stdlib json is the fallback
+    orjson = None
 
 JSON = Dict[str, Any]
 
@@ -16,21 +24,103 @@ DSL_VERSION = "1.0"
 # Precision control: stabilizes float noise for training
 ROUND_DECIMALS = 5
 
+# Scenes smaller than this are observed with a plain comprehension; numpy's setup cost only
+# pays off for larger ones.
+VECTORIZE_MIN_OBJECTS = 64
+
 _snapshot_counter = 0
-_snapshots: Dict[str, JSON] = {}
 
+Transform = Tuple[Tuple[float, float, float], Tuple[float, float, float], Tuple[float, float, float]]
 
-def write_json(obj: JSON) -> None:
-    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
-    sys.stdout.flush()
+# Transforms are compared as one packed fixed-point key (9 x int64) instead of 9 floats.
+_KEY_SCALE = 10 ** ROUND_DECIMALS
+_KEY_STRUCT = struct.Struct("<9q")
+
+# A stored object: its snapshot record plus its packed transform key.
+Entry = Tuple[JSON, bytes]
+
+# Snapshot store: the first capture is kept in full, every later one only as the
+# per-object delta against its predecessor (None marks a removed object).
+_snap_base: Dict[str, Entry] = {}
+_snap_deltas: Dict[str, Dict[str, Optional[Entry]]] = {}
+_snap_order: List[str] = []
+_snap_pos: Dict[str, int] = {}
+_snap_head: Dict[str, Entry] = {}
+
+# Snapshot id handed out by world_mutate whose scene walk has not run yet. It is
+# captured on first read, or right before the scene changes again.
+_pending_sid: Optional[str] = None
+
+# Recently reconstructed views (name -> entry), most recently used last.
+MATERIALIZE_CACHE_SIZE = 16
+_materialized: OrderedDict[str, Dict[str, Entry]] = OrderedDict()
+
+# Collection name -> names of its member objects, seeded once per collection and
+# dropped at the end of every world_mutate so external edits are picked up.
+_link_cache: Dict[str, Set[str]] = {}
+
+# Object name -> object for lookups made within one world_mutate batch; cleared with _link_cache.
+_name_cache: Dict[str, bpy.types.Object] = {}
+
+# Every DSL cube shares one mesh datablock; per-part size lives on the object transform.
+_UNIT_CUBE_MESH: bpy.types.Mesh | None = None
+
+# Unit cube geometry as flat foreach_set buffers (8 verts, 6 quads, 24 loops).
+_CUBE_VERTS_NP = np.array([
+    -1, -1, -1,  1, -1, -1,  1, 1, -1,  -1, 1, -1,
+    -1, -1, 1,   1, -1, 1,   1, 1, 1,   -1, 1, 1,
+], dtype=np.float32)
+# quads wound outward: -Z, +Z, -Y, +X, +Y, -X
+_CUBE_LOOP_VIDX = np.array([
+    0, 3, 2, 1,  4, 5, 6, 7,  0, 1, 5, 4,
+    1, 2, 6, 5,  2, 3, 7, 6,  3, 0, 4, 7,
+], dtype=np.int32)
+_CUBE_LOOP_START = np.arange(0, 24, 4, dtype=np.int32)
+_CUBE_LOOP_TOTAL = np.full(6, 4, dtype=np.int32)
+
+
+# stdlib fallback: one compact encoder/decoder instead of re-parsing kwargs per call
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_DECODER = json.JSONDecoder()
 
 
-def _r(x: float) -> float:
-    return round(float(x), ROUND_DECIMALS)
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _ENCODER.encode(obj).encode("utf-8")
 
 
-def _vec3(v) -> List[float]:
-    return [_r(v[0]), _r(v[1]), _r(v[2])]
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return _DECODER.decode(data.decode("utf-8"))
+
+
+def write_json(obj: JSON) -> None:
+    # Framed like LSP: "Content-Length: N\r\n\r\n" followed by N bytes of UTF-8 JSON.
+    # Header and body are separate writes into the same buffer, so the payload is never copied.
+    data = _dumps(obj)
+    out = sys.stdout.buffer
+    out.write(b"Content-Length: %d\r\n\r\n" % len(data))
+    out.write(data)
+    out.flush()
+
+
+def read_message(stdin) -> bytes | None:
+    length = None
+    while True:
+        line = stdin.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            if length is None:
+                continue
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    return stdin.read(length)
 
 
 def _next_snapshot_id() -> str:
@@ -46,6 +136,7 @@ def bootstrap_clean_scene() -> None:
 
 
 def world_reset(seed: int = 0) -> JSON:
+    _resolve_pending()
     bootstrap_clean_scene()
 
     scene = bpy.context.scene
@@ -54,32 +145,64 @@ def world_reset(seed: int = 0) -> JSON:
     scene.frame_set(1)
 
     sid = _next_snapshot_id()
-    snap = world_observe_compact(snapshot_id=sid)
-    _snapshots[sid] = snap
+    _capture_snapshot(sid)
 
     return {"ok": True, "seed": seed, "snapshot_id": sid, "object_count": 0}
 
 
+def _rounded_vec3s(objects, attr: str) -> List[List[float]]:
+    # One bulk copy + one vectorized round for all objects instead of 3 _r calls per object.
+    n = len(objects)
+    buf = np.empty(n * 3, dtype=np.float32)
+    try:
+        objects.foreach_get(attr, buf)
+        arr = buf.astype(np.float64).reshape(n, 3)
+    except (AttributeError, TypeError, RuntimeError):
+        arr = np.fromiter((c for o in objects for c in getattr(o, attr)), dtype=np.float64, count=3 * n).reshape(n, 3)
+    np.round(arr, ROUND_DECIMALS, out=arr)
+    return arr.tolist()
+
+
 def world_observe_compact(snapshot_id: str | None = None) -> JSON:
+    # Scene-level reads happen once; per object, users_collection is read a single time.
     scene = bpy.context.scene
-    objs: List[JSON] = []
+    objects = scene.objects
+    master = scene.collection.name
+    scene_info = {"name": scene.name, "frame": int(scene.frame_current), "frame_range": [int(scene.frame_start), int(scene.frame_end)]}
 
-    for obj in scene.objects:
-        objs.append(
+    if len(objects) < VECTORIZE_MIN_OBJECTS:
+        rd = ROUND_DECIMALS
+        objs: List[JSON] = [
             {
-                "name": obj.name,
-                "type": obj.type,
-                "location": _vec3(obj.location),
-                "rotation_euler": _vec3(obj.rotation_euler),
-                "scale": _vec3(obj.scale),
-                "collection": (obj.users_collection[0].name if obj.users_collection else scene.collection.name),
+                "name": o.name,
+                "type": o.type,
+                "location": [round(o.location[0], rd), round(o.location[1], rd), round(o.location[2], rd)],
+                "rotation_euler": [round(o.rotation_euler[0], rd), round(o.rotation_euler[1], rd), round(o.rotation_euler[2], rd)],
+                "scale": [round(o.scale[0], rd), round(o.scale[1], rd), round(o.scale[2], rd)],
+                "collection": (uc[0].name if (uc := o.users_collection) else master),
             }
-        )
+            for o in objects
+        ]
+    else:
+        locs = _rounded_vec3s(objects, "location")
+        rots = _rounded_vec3s(objects, "rotation_euler")
+        scas = _rounded_vec3s(objects, "scale")
+        objs = [
+            {
+                "name": o.name,
+                "type": o.type,
+                "location": loc,
+                "rotation_euler": rot,
+                "scale": sca,
+                "collection": (uc[0].name if (uc := o.users_collection) else master),
+            }
+            for o, loc, rot, sca in zip(objects, locs, rots, scas)
+        ]
 
     return {
         "snapshot_version": SNAPSHOT_VERSION,
         "snapshot_id": snapshot_id,
-        "scene": {"name": scene.name, "frame": int(scene.frame_current), "frame_range": [int(scene.frame_start), int(scene.frame_end)]},
+        "scene": scene_info,
         "objects": objs,
         "summary_text": f"{len(objs)} objects in scene.",
     }
@@ -89,38 +212,136 @@ def _obj_map(snap: JSON) -> Dict[str, JSON]:
     return {str(o.get("name")): o for o in (snap.get("objects") or [])}
 
 
-def _transform_tuple(o: JSON) -> Tuple[Tuple[float, float, float], Tuple[float, float, float], Tuple[float, float, float]]:
+def _transform_tuple(o: JSON) -> Transform:
     loc = tuple(float(x) for x in o.get("location", [0, 0, 0]))
     rot = tuple(float(x) for x in o.get("rotation_euler", [0, 0, 0]))
     sca = tuple(float(x) for x in o.get("scale", [1, 1, 1]))
     return loc, rot, sca
 
 
+def _transform_key(o: JSON) -> bytes:
+    # Values are already rounded to ROUND_DECIMALS, so scaling back to integers is exact.
+    k = _KEY_SCALE
+    return _KEY_STRUCT.pack(*(int(round(v * k)) for v in (*o["location"], *o["rotation_euler"], *o["scale"])))
+
+
+def _entry_changed(prev: Optional[Entry], cur: Entry) -> bool:
+    if prev is None:
+        return True
+    po, pk = prev
+    co, ck = cur
+    return pk != ck or po.get("collection") != co.get("collection") or po.get("type") != co.get("type")
+
+
+def _remember_view(sid: str, view: Dict[str, Entry]) -> None:
+    _materialized[sid] = view
+    _materialized.move_to_end(sid)
+    while len(_materialized) > MATERIALIZE_CACHE_SIZE:
+        _materialized.popitem(last=False)
+
+
+def _capture_snapshot(sid: str) -> JSON:
+    global _snap_head
+    snap = world_observe_compact(snapshot_id=sid)
+    current = {k: (o, _transform_key(o)) for k, o in _obj_map(snap).items()}
+
+    if not _snap_order:
+        _snap_base.update(current)
+        delta: Dict[str, Optional[Entry]] = {}
+    else:
+        delta = {k: e for k, e in current.items() if _entry_changed(_snap_head.get(k), e)}
+        for k in _snap_head:
+            if k not in current:
+                delta[k] = None
+
+    _snap_pos[sid] = len(_snap_order)
+    _snap_order.append(sid)
+    _snap_deltas[sid] = delta
+    _snap_head = current
+    _remember_view(sid, current)
+    return snap
+
+
+def _resolve_pending() -> JSON | None:
+    global _pending_sid
+    sid = _pending_sid
+    if sid is None:
+        return None
+    _pending_sid = None
+    return _capture_snapshot(sid)
+
+
+def world_observe() -> JSON:
+    # A pending mutate snapshot was taken from the same scene state, so reuse its walk.
+    prev = _resolve_pending()
+    sid = _next_snapshot_id()
+    if prev is None:
+        return _capture_snapshot(sid)
+
+    _snap_pos[sid] = len(_snap_order)
+    _snap_order.append(sid)
+    _snap_deltas[sid] = {}
+    _remember_view(sid, _snap_head)
+    return dict(prev, snapshot_id=sid)
+
+
+def _materialize(sid: str) -> Dict[str, Entry]:
+    view = _materialized.get(sid)
+    if view is not None:
+        _materialized.move_to_end(sid)
+        return view
+
+    # Replay deltas forward from the closest cached view (or the base).
+    pos = _snap_pos[sid]
+    start = pos
+    while start > 0 and _snap_order[start - 1] not in _materialized:
+        start -= 1
+    view = dict(_materialized[_snap_order[start - 1]]) if start > 0 else dict(_snap_base)
+    for s in _snap_order[start:pos + 1]:
+        for k, e in _snap_deltas[s].items():
+            if e is None:
+                view.pop(k, None)
+            else:
+                view[k] = e
+
+    _remember_view(sid, view)
+    return view
+
+
 def world_observe_diff(from_id: str, to_id: str) -> JSON:
-    a = _snapshots.get(from_id)
-    b = _snapshots.get(to_id)
-    if not a or not b:
+    if _pending_sid is not None and _pending_sid in (from_id, to_id):
+        _resolve_pending()
+    if from_id not in _snap_pos or to_id not in _snap_pos:
         return {"ok": False, "diff_version": DIFF_VERSION, "error": "unknown snapshot_id", "from": from_id, "to": to_id}
 
-    a_objs = _obj_map(a)
-    b_objs = _obj_map(b)
+    a_objs = _materialize(from_id)
+    b_objs = _materialize(to_id)
+
+    # Only objects touched by a delta between the two snapshots can differ.
+    lo, hi = sorted((_snap_pos[from_id], _snap_pos[to_id]))
+    touched: set = set()
+    for s in _snap_order[lo + 1:hi + 1]:
+        touched.update(_snap_deltas[s])
 
-    added = sorted([k for k in b_objs.keys() if k not in a_objs])
-    removed = sorted([k for k in a_objs.keys() if k not in b_objs])
+    added = sorted(k for k in touched if k in b_objs and k not in a_objs)
+    removed = sorted(k for k in touched if k in a_objs and k not in b_objs)
+    shared = sorted(k for k in touched if k in a_objs and k in b_objs)
 
+    # Readable from/to payloads are only built for objects whose keys differ.
     transforms_changed: List[JSON] = []
-    for k in sorted(set(a_objs.keys()) & set(b_objs.keys())):
-        ta = _transform_tuple(a_objs[k])
-        tb = _transform_tuple(b_objs[k])
-        if ta != tb:
+    for k in shared:
+        (oa, ka), (ob, kb) = a_objs[k], b_objs[k]
+        if ka != kb:
+            ta = _transform_tuple(oa)
+            tb = _transform_tuple(ob)
             transforms_changed.append({"name": k, "from": {"loc": list(ta[0]), "rot": list(ta[1]), "scale": list(ta[2])},
                                        "to": {"loc": list(tb[0]), "rot": list(tb[1]), "scale": list(tb[2])}})
 
     # Collection change is also useful
     collections_changed: List[JSON] = []
-    for k in sorted(set(a_objs.keys()) & set(b_objs.keys())):
-        ca = a_objs[k].get("collection")
-        cb = b_objs[k].get("collection")
+    for k in shared:
+        ca = a_objs[k][0].get("collection")
+        cb = b_objs[k][0].get("collection")
         if ca != cb:
             collections_changed.append({"name": k, "from": ca, "to": cb})
 
@@ -149,14 +370,61 @@ def _ensure_collection(name: str) -> bpy.types.Collection:
 
 def _link_object_to_collection(obj: bpy.types.Object, col: bpy.types.Collection) -> None:
     # Link if not already linked
-    if obj.name not in col.objects:
+    members = _link_cache.get(col.name)
+    if members is None:
+        members = _link_cache[col.name] = set(col.objects.keys())
+    if obj.name not in members:
         col.objects.link(obj)
+        members.add(obj.name)
     # Optional: remove from master collection to avoid duplicates
     # Keep it non-destructive for now.
 
 
 def _find_object(name: str) -> bpy.types.Object | None:
-    return bpy.data.objects.get(str(name))
+    name = str(name)
+    obj = _name_cache.get(name)
+    if obj is None:
+        obj = bpy.data.objects.get(name)
+        if obj is not None:
+            _name_cache[name] = obj
+    return obj
+
+
+def _float3(v) -> Tuple[float, float, float]:
+    return float(v[0]), float(v[1]), float(v[2])
+
+
+def _unit_cube_mesh() -> bpy.types.Mesh:
+    global _UNIT_CUBE_MESH
+    if _UNIT_CUBE_MESH is not None:
+        try:
+            _UNIT_CUBE_MESH.name  # raises ReferenceError once the datablock was removed
+            return _UNIT_CUBE_MESH
+        except ReferenceError:
+            _UNIT_CUBE_MESH = None
+
+    mesh = bpy.data.meshes.new("_unit_cube")
+    try:
+        mesh.vertices.add(8)
+        mesh.loops.add(24)
+        mesh.polygons.add(6)
+        mesh.vertices.foreach_set("co", _CUBE_VERTS_NP)
+        mesh.loops.foreach_set("vertex_index", _CUBE_LOOP_VIDX)
+        mesh.polygons.foreach_set("loop_start", _CUBE_LOOP_START)
+        # Blender 4.x derives loop_total from loop_start (read-only); older versions need it set.
+        # The flag lives on the element struct; mesh.polygons.bl_rna is the collection's.
+        if not bpy.types.MeshPolygon.bl_rna.properties["loop_total"].is_readonly:
+            mesh.polygons.foreach_set("loop_total", _CUBE_LOOP_TOTAL)
+        mesh.update(calc_edges=True)
+    except Exception:
+        bpy.data.meshes.remove(mesh)  # don't leave a half-built _unit_cube.NNN behind
+        raise
+
+    _UNIT_CUBE_MESH = mesh
+    return mesh
+
+
+_SUPPORTED_PRIMITIVES = {"cube"}
 
 
 def _dsl_object_create_primitive(args: JSON) -> JSON:
@@ -165,40 +433,19 @@ def _dsl_object_create_primitive(args: JSON) -> JSON:
     location = args.get("location", [0.0, 0.0, 0.0])
     collection = args.get("collection")
 
-    supported = {"cube"}
-    if prim_type not in supported:
-        return {"ok": False, "error": f"primitive type not supported in v1: {prim_type}", "supported": sorted(list(supported))}
+    if prim_type not in _SUPPORTED_PRIMITIVES:
+        return {
+            "ok": False,
+            "error": f"primitive type not supported in v1: {prim_type}",
+            "supported": sorted(_SUPPORTED_PRIMITIVES),
+        }
 
-    # Create cube mesh manually
-    mesh = bpy.data.meshes.new(name + "_Mesh")
-    obj = bpy.data.objects.new(name, mesh)
+    obj = bpy.data.objects.new(name, _unit_cube_mesh())
     bpy.context.scene.collection.objects.link(obj)
-
-    verts = [
-        (-1, -1, -1),
-        (1, -1, -1),
-        (1, 1, -1),
-        (-1, 1, -1),
-        (-1, -1, 1),
-        (1, -1, 1),
-        (1, 1, 1),
-        (-1, 1, 1),
-    ]
-    faces = [
-        (0, 1, 2, 3),
-        (4, 5, 6, 7),
-        (0, 1, 5, 4),
-        (1, 2, 6, 5),
-        (2, 3, 7, 6),
-        (3, 0, 4, 7),
-    ]
-    mesh.from_pydata(verts, [], faces)
-    mesh.update()
+    _name_cache[obj.name] = obj
 
     try:
-        obj.location.x = float(location[0])
-        obj.location.y = float(location[1])
-        obj.location.z = float(location[2])
+        obj.location = _float3(location)
     except Exception:
         pass
 
@@ -215,23 +462,15 @@ def _dsl_object_set_transform(args: JSON) -> JSON:
     if obj is None:
         return {"ok": False, "error": f"object not found: {name}"}
 
+    # One whole-vector write per property instead of three per-axis writes.
     if "location" in args:
-        loc = args.get("location")
-        obj.location.x = float(loc[0])
-        obj.location.y = float(loc[1])
-        obj.location.z = float(loc[2])
+        obj.location = _float3(args.get("location"))
 
     if "rotation_euler" in args:
-        rot = args.get("rotation_euler")
-        obj.rotation_euler.x = float(rot[0])
-        obj.rotation_euler.y = float(rot[1])
-        obj.rotation_euler.z = float(rot[2])
+        obj.rotation_euler = _float3(args.get("rotation_euler"))
 
     if "scale" in args:
-        sca = args.get("scale")
-        obj.scale.x = float(sca[0])
-        obj.scale.y = float(sca[1])
-        obj.scale.z = float(sca[2])
+        obj.scale = _float3(args.get("scale"))
 
     return {"ok": True, "updated": name}
 
@@ -242,6 +481,9 @@ def _dsl_object_delete(args: JSON) -> JSON:
     if obj is None:
         return {"ok": False, "error": f"object not found: {name}"}
     bpy.data.objects.remove(obj, do_unlink=True)
+    _name_cache.pop(name, None)
+    for members in _link_cache.values():
+        members.discard(name)
     return {"ok": True, "deleted": name}
 
 
@@ -253,56 +495,155 @@ def _dsl_collection_create(args: JSON) -> JSON:
     return {"ok": True, "created": name}
 
 
-def _dsl_collection_link_object(args: JSON) -> JSON:
-    col_name = str(args.get("collection", ""))
-    obj_name = str(args.get("object", ""))
-    if not col_name or not obj_name:
-        return {"ok": False, "error": "collection and object required"}
+def _dsl_collection_link_objects(col_name: str, entries: List[Tuple[int, str]], results: List[Optional[JSON]]) -> None:
+    # Grouped collection.link_object: resolve the collection and its members once per batch.
     col = _ensure_collection(col_name)
-    obj = _find_object(obj_name)
-    if obj is None:
-        return {"ok": False, "error": f"object not found: {obj_name}"}
-    _link_object_to_collection(obj, col)
-    return {"ok": True, "linked": {"object": obj_name, "collection": col_name}}
+    for i, obj_name in entries:
+        obj = _find_object(obj_name)
+        if obj is None:
+            results[i] = {"ok": False, "error": f"object not found: {obj_name}"}
+            continue
+        _link_object_to_collection(obj, col)
+        results[i] = {"ok": True, "linked": {"object": obj_name, "collection": col_name}}
 
 
-def world_mutate(dsl_version: str, batch: List[JSON]) -> JSON:
-    if dsl_version != DSL_VERSION:
-        return {"ok": False, "error": f"unsupported dsl_version {dsl_version}", "supported": DSL_VERSION}
-
-    applied = 0
-    warnings: List[str] = []
+def _flush_links(pending: Dict[str, List[Tuple[int, str]]], results: List[Optional[JSON]]) -> None:
+    for col_name, entries in pending.items():
+        try:
+            _dsl_collection_link_objects(col_name, entries, results)
+        except Exception as ex:
+            for i, _ in entries:
+                if results[i] is None:
+                    results[i] = {"ok": False, "error": repr(ex)}
+    pending.clear()
+
+
+# Ops run as they come; collection.link_object is grouped per collection by world_mutate.
+_OP_TABLE = {
+    "object.create_primitive": _dsl_object_create_primitive,
+    "object.set_transform": _dsl_object_set_transform,
+    "object.delete": _dsl_object_delete,
+    "collection.create": _dsl_collection_create,
+}
+
+# Every supported op with the args it cannot run without.
+_OP_REQUIRED_ARGS: Dict[str, Tuple[str, ...]] = {
+    "object.create_primitive": (),
+    "object.set_transform": ("name",),
+    "object.delete": ("name",),
+    "collection.create": ("name",),
+    "collection.link_object": ("collection", "object"),
+}
+
+_VEC3_ARGS = ("location", "rotation_euler", "scale")
+
+
+def _validate_batch(batch: List[JSON]) -> List[JSON]:
+    # One linear scan before any Blender state is touched.
     errors: List[JSON] = []
-
     for i, item in enumerate(batch):
+        if not isinstance(item, dict):
+            errors.append({"index": i, "op": None, "error": "batch item must be an object"})
+            continue
         op = str(item.get("op", ""))
+        required = _OP_REQUIRED_ARGS.get(op)
+        if required is None:
+            errors.append({"index": i, "op": op, "error": "op not supported in v3"})
+            continue
         args = item.get("args") or {}
+        if not isinstance(args, dict):
+            errors.append({"index": i, "op": op, "error": "args must be an object"})
+            continue
+        missing = [k for k in required if not args.get(k)]
+        if missing:
+            errors.append({"index": i, "op": op, "error": f"missing args: {', '.join(missing)}"})
+            continue
+        if op == "object.create_primitive":
+            prim_type = str(args.get("type", "cube")).lower()
+            if prim_type not in _SUPPORTED_PRIMITIVES:
+                errors.append({"index": i, "op": op, "error": f"primitive type not supported in v1: {prim_type}"})
+                continue
+        for k in _VEC3_ARGS:
+            if k in args:
+                try:
+                    _float3(args[k])
+                except (TypeError, ValueError, IndexError, KeyError):
+                    errors.append({"index": i, "op": op, "error": f"{k} must be 3 numbers"})
+                    break
+    return errors
 
-        try:
-            if op == "object.create_primitive":
-                r = _dsl_object_create_primitive(args)
-            elif op == "object.set_transform":
-                r = _dsl_object_set_transform(args)
-            elif op == "object.delete":
-                r = _dsl_object_delete(args)
-            elif op == "collection.create":
-                r = _dsl_collection_create(args)
-            elif op == "collection.link_object":
-                r = _dsl_collection_link_object(args)
-            else:
-                r = {"ok": False, "error": "op not supported in v3"}
 
-            if r.get("ok"):
-                applied += 1
-            else:
-                errors.append({"index": i, "op": op, "error": r.get("error", "unknown")})
+def world_mutate(dsl_version: str, batch: List[JSON]) -> JSON:
+    global _pending_sid
+    if dsl_version != DSL_VERSION:
+        return {"ok": False, "error": f"unsupported dsl_version {dsl_version}", "supported": DSL_VERSION}
 
-        except Exception as ex:
-            errors.append({"index": i, "op": op, "error": repr(ex)})
+    # The previous mutate snapshot must see the scene before this batch touches it.
+    _resolve_pending()
+
+    warnings: List[str] = []
+    results: List[Optional[JSON]] = [None] * len(batch)
+
+    invalid = _validate_batch(batch)
+    if invalid:
+        sid = _next_snapshot_id()
+        _pending_sid = sid
+        return {
+            "ok": False,
+            "dsl_version": DSL_VERSION,
+            "applied": 0,
+            "errors": invalid,
+            "warnings": warnings,
+            "snapshot_id": sid,
+        }
+
+    try:
+        ops = [str(item.get("op", "")) for item in batch]
+
+        # collection.link_object ops are grouped per collection and applied together.
+        # Pending links are flushed before any op that could change how they resolve
+        # (a delete, or creating their object or collection), so every op sees the
+        # scene it would have seen running the batch strictly in order.
+        pending_links: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+        pending_objects: Set[str] = set()
+
+        for i, item in enumerate(batch):
+            op = ops[i]
+            args = item.get("args") or {}
+
+            if op == "collection.link_object":
+                obj_name = str(args["object"])
+                pending_links[str(args["collection"])].append((i, obj_name))
+                pending_objects.add(obj_name)
+                continue
+            if pending_links and (
+                op == "object.delete"
+                or (op == "object.create_primitive" and str(args.get("name", "Object")) in pending_objects)
+                or (op == "collection.create" and str(args["name"]) in pending_links)
+            ):
+                _flush_links(pending_links, results)
+                pending_objects.clear()
+
+            try:
+                results[i] = _OP_TABLE[op](args)
+            except Exception as ex:
+                results[i] = {"ok": False, "error": repr(ex)}
+
+        _flush_links(pending_links, results)
+    finally:
+        _link_cache.clear()
+        _name_cache.clear()
+
+    applied = 0
+    errors: List[JSON] = []
+    for i, r in enumerate(results):
+        if r is not None and r.get("ok"):
+            applied += 1
+        else:
+            errors.append({"index": i, "op": ops[i], "error": (r or {}).get("error", "unknown")})
 
     sid = _next_snapshot_id()
-    snap = world_observe_compact(snapshot_id=sid)
-    _snapshots[sid] = snap
+    _pending_sid = sid
 
     return {
         "ok": len(errors) == 0,
@@ -317,18 +658,28 @@ def world_mutate(dsl_version: str, batch: List[JSON]) -> JSON:
 def main() -> None:
     # stdout must be JSON-only.
     bootstrap_clean_scene()
-    write_json({"ok": True, "type": "bridge_ready", "snapshot_version": SNAPSHOT_VERSION, "dsl_version": DSL_VERSION})
+    stdin = sys.stdin.buffer
+    # Responses go straight to the binary buffer and are flushed once per message.
+    try:
+        sys.stdout.reconfigure(line_buffering=False)
+    except Exception:
+        pass
+
+    # The handshake stays a single JSON line; it announces framing for everything after it.
+    ready = {"ok": True, "type": "bridge_ready", "snapshot_version": SNAPSHOT_VERSION, "dsl_version": DSL_VERSION,
+             "framing": "content-length"}
+    out = sys.stdout.buffer
+    out.write(_dumps(ready))
+    out.write(b"\n")
+    out.flush()
 
     while True:
-        line = sys.stdin.readline()
-        if not line:
+        body = read_message(stdin)
+        if body is None:
             break
-        line = line.strip()
-        if not line:
-            continue
 
         try:
-            req = json.loads(line)
+            req = _loads(body)
             tool = req.get("tool")
             args = req.get("args") or {}
 
@@ -338,10 +689,7 @@ def main() -> None:
                 continue
 
             if tool == "world.observe":
-                sid = _next_snapshot_id()
-                snap = world_observe_compact(snapshot_id=sid)
-                _snapshots[sid] = snap
-                write_json(snap)
+                write_json(world_observe())
                 continue
 
             if tool == "world.observe_diff":
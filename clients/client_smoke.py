@@ -1,8 +1,25 @@
-import json
+import argparse
 import os
 import subprocess
 import sys
 import threading
+from pathlib import Path
+
+# Run as `python clients/client_smoke.py`, sys.path[0] is clients/; the repo root is
+# needed to import server.daemon.
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+try:
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+
+    loads = orjson.loads
+except ImportError:
+    from json import dumps, loads
 
 def drain(prefix, stream):
     for line in stream:
@@ -11,88 +28,125 @@ def drain(prefix, stream):
             print(f"{prefix}{line}")
 
 def send(p, obj):
-    p.stdin.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    p.stdin.write(dumps(obj) + "\n")
     p.stdin.flush()
     line = p.stdout.readline().strip()
     if not line:
         raise RuntimeError("No response from server (stdout empty).")
-    return json.loads(line)
+    return loads(line)
+
+def notify(p, obj):
+    # notifications get no response line
+    p.stdin.write(dumps(obj) + "\n")
+    p.stdin.flush()
 
 def tool_text(resp):
     # MCP tool result is in result.content[0].text as JSON string
     txt = resp["result"]["content"][0]["text"]
-    return json.loads(txt)
+    return loads(txt)
+
+def call(p, _id, name, arguments):
+    return send(p, {"jsonrpc":"2.0","id":_id,"method":"tools/call","params":{"name":name,"arguments":arguments}})
+
+def start_server():
+    # Reuse a running server daemon (python -m server.daemon) instead of spawning one.
+    try:
+        from server.daemon import connect
+    except ImportError as e:
+        print(f"[client] server daemon unavailable ({e}); spawning a server")
+        connect = None
+    p = connect() if connect else None
+    if p is not None:
+        print("[client] using server daemon")
+        return p
 
-if __name__ == "__main__":
     env = os.environ.copy()
+    # PERF=1: discard server stderr instead of draining it on a second thread
+    perf = os.environ.get("PERF") == "1"
 
     p = subprocess.Popen(
         [sys.executable, "-m", "server.mcp_server"],
         stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+        stderr=subprocess.DEVNULL if perf else subprocess.PIPE,
         text=True,
         encoding="utf-8",
         errors="replace",
-        bufsize=1,
+        bufsize=-1,  # send() flushes explicitly
         env=env,
     )
 
-    assert p.stdin and p.stdout and p.stderr
+    assert p.stdin and p.stdout
+
+    if not perf:
+        # Drain stderr so it never blocks
+        t = threading.Thread(target=drain, args=("[stderr] ", p.stderr), daemon=True)
+        t.start()
+    return p
+
+def run(include_health=True):
+    """Smoke-test the MCP server end to end."""
+    p = start_server()
 
-    # Drain stderr so it never blocks
-    t = threading.Thread(target=drain, args=("[stderr] ", p.stderr), daemon=True)
-    t.start()
+    # 0) notifications, known and unknown: the server must not answer them, or every
+    #    later reply on a shared daemon session would be off by one
+    notify(p, {"jsonrpc":"2.0","method":"notifications/initialized"})
+    notify(p, {"jsonrpc":"2.0","method":"notifications/cancelled","params":{"requestId":0}})
 
     # 1) tools/list
     r = send(p, {"jsonrpc":"2.0","id":1,"method":"tools/list","params":{}})
-    print("[tools/list]", json.dumps(r, ensure_ascii=False))
+    print("[tools/list]", dumps(r))
+    if r.get("id") != 1 or "result" not in r:
+        raise RuntimeError(f"tools/list got a reply meant for another message: {r}")
 
-    # 2) system_info
-    r = send(p, {"jsonrpc":"2.0","id":2,"method":"tools/call","params":{"name":"system_info","arguments":{}}})
-    sys_info = tool_text(r)
-    print("[system_info]", sys_info)
+    if include_health:
+        # 2) system_info
+        sys_info = tool_text(call(p, 2, "system_info", {}))
+        print("[system_info]", sys_info)
 
-    # 3) world_health
-    r = send(p, {"jsonrpc":"2.0","id":3,"method":"tools/call","params":{"name":"world_health","arguments":{}}})
-    health = tool_text(r)
-    print("[world_health]", health)
+        # 3) world_health
+        health = tool_text(call(p, 3, "world_health", {}))
+        print("[world_health]", health)
 
     # 4) reset
-    r = send(p, {"jsonrpc":"2.0","id":4,"method":"tools/call","params":{"name":"world_reset","arguments":{"seed":0}}})
-    reset_out = tool_text(r)
+    reset_out = tool_text(call(p, 4, "world_reset", {"seed":0}))
     print("[reset_out]", reset_out)
-    s_reset = reset_out["snapshot_id"]
 
     # 5) observe -> Sx
-    r = send(p, {"jsonrpc":"2.0","id":5,"method":"tools/call","params":{"name":"world_observe","arguments":{"level":"compact"}}})
-    obs0 = tool_text(r)
+    obs0 = tool_text(call(p, 5, "world_observe", {"level":"compact"}))
     print("[observe0]", obs0)
     s0 = obs0["snapshot_id"]
 
     # 6) mutate create cube
-    r = send(p, {"jsonrpc":"2.0","id":6,"method":"tools/call","params":{"name":"world_mutate","arguments":{
+    mut = tool_text(call(p, 6, "world_mutate", {
         "dsl_version":"1.0",
         "batch":[{"op":"object.create_primitive","args":{"type":"cube","name":"Chair_Seat","location":[0,0,0.45]}}]
-    }}})
-    mut = tool_text(r)
+    }))
     print("[mutate]", mut)
+    if not mut.get("ok") or mut.get("applied") != 1:
+        raise RuntimeError(f"world_mutate did not create the cube: {mut}")
     s1 = mut["snapshot_id"]
 
     # 7) observe after mutate
-    r = send(p, {"jsonrpc":"2.0","id":7,"method":"tools/call","params":{"name":"world_observe","arguments":{"level":"compact"}}})
-    obs1 = tool_text(r)
+    obs1 = tool_text(call(p, 7, "world_observe", {"level":"compact"}))
     print("[observe1]", obs1)
+    if "Chair_Seat" not in [o.get("name") for o in obs1["objects"]]:
+        raise RuntimeError(f"Chair_Seat missing from world_observe: {obs1}")
     s2 = obs1["snapshot_id"]
 
     # 8) diff between observe0 and mutate result
-    r = send(p, {"jsonrpc":"2.0","id":8,"method":"tools/call","params":{"name":"world_observe_diff","arguments":{"from":s0,"to":s1}}})
-    diff1 = tool_text(r)
+    diff1 = tool_text(call(p, 8, "world_observe_diff", {"from":s0,"to":s1}))
     print("[diff s0->s1]", diff1)
 
     # 9) diff between mutate result and observe1
-    r = send(p, {"jsonrpc":"2.0","id":9,"method":"tools/call","params":{"name":"world_observe_diff","arguments":{"from":s1,"to":s2}}})
-    diff2 = tool_text(r)
+    diff2 = tool_text(call(p, 9, "world_observe_diff", {"from":s1,"to":s2}))
     print("[diff s1->s2]", diff2)
 
     p.kill()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MCP server smoke test")
+    parser.add_argument("--include-health", action=argparse.BooleanOptionalAction, default=True,
+                        help="call system_info and world_health before the world tools")
+    opts = parser.parse_args()
+    run(include_health=opts.include_health)
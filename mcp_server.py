@@ -0,0 +1,5 @@
+# mcp_server.py  (`python mcp_server.py` from the repo root; the server lives in server/)
+from server.mcp_server import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# _common.py  (JSON codec and stderr logging shared by the providers and the MCP server)
+from __future__ import annotations
+
+import json
+import sys
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# One encoder/decoder for the process; orjson when available, compact stdlib otherwise.
+# dumps always produces UTF-8 bytes; loads takes bytes or str.
+if orjson is not None:
+    dumps = orjson.dumps
+    loads = orjson.loads
+else:
+    _json_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    _json_decode = json.JSONDecoder().decode
+
+    def dumps(obj: Any) -> bytes:
+        return _json_encode(obj).encode("utf-8")
+
+    def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+        return _json_decode(data if isinstance(data, str) else str(data, "utf-8"))
+
+
+def eprint(*args: Any) -> None:
+    # stdout carries the protocol, so diagnostics go to stderr; flushed because these are
+    # rare error lines that must survive the process being terminated
+    print(*args, file=sys.stderr, flush=True)
@@ -1,52 +1,293 @@
 # provider_headless.py
 from __future__ import annotations
 
-import json
+import asyncio
 import os
-import subprocess
-import sys
 import threading
+from collections import deque
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from ._common import dumps, eprint, loads
 
 JSON = Dict[str, Any]
+T = TypeVar("T")
+
+
+# Blender's stderr is only echoed with TORR_DEBUG set; the last line is always kept for errors.
+_DEBUG = bool(os.environ.get("TORR_DEBUG"))
+
+# Probed when BLENDER_EXE is unset, in order.
+_BLENDER_CANDIDATES = (
+    r"C:\Program Files\Blender Foundation\Blender 5.0\blender.exe",
+    r"D:\Blender_5.0.0_Portable\blender.exe",
+)
+
+
+def _exe_cache_path() -> Path:
+    # per-user cache dir: a shared temp dir would let another user choose what we exec
+    base = os.environ.get("LOCALAPPDATA") if os.name == "nt" else os.environ.get("XDG_CACHE_HOME")
+    return Path(base or Path.home() / ".cache") / "torr" / "blender_exe.json"
+
+
+def _owned_privately(path: Path) -> bool:
+    # Windows: LOCALAPPDATA is already private to the user and there is no uid to compare
+    if not hasattr(os, "getuid"):
+        return True
+    st = path.stat()
+    return st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+def _read_exe_cache() -> Optional[str]:
+    """Last resolved candidate, if the cache is ours and the exe's mtime is unchanged."""
+    cache = _exe_cache_path()
+    try:
+        if not (_owned_privately(cache.parent) and _owned_privately(cache)):
+            return None
+        cached = loads(cache.read_bytes())
+        path = cached["path"]
+        # only ever one of our own candidates, so the cache can skip probes but not redirect them
+        if path in _BLENDER_CANDIDATES and os.path.getmtime(path) == cached["mtime"]:
+            return path
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_exe_cache(path: str) -> None:
+    cache = _exe_cache_path()
+    try:
+        cache.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not _owned_privately(cache.parent):
+            return
+        tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(dumps({"path": path, "mtime": os.path.getmtime(path)}))
+        os.replace(tmp, cache)
+    except OSError:
+        pass  # cache is best effort
+
+
+class _BridgeLoop:
+    """
+    Event loop on a daemon thread that owns the Blender pipes.
+    Requests are queued as futures and written in order by a single writer task; a single reader
+    task answers them first-in first-out (the bridge handles one message at a time).
+    """
 
+    # StreamReader line limit: older JSONL bridges put a whole snapshot on one line.
+    STREAM_LIMIT = 1 << 26
 
-def eprint(*args: Any) -> None:
-    print(*args, file=sys.stderr, flush=True)
+    def __init__(self, on_stderr: Callable[[bytes], None]) -> None:
+        self._on_stderr = on_stderr
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="blender-bridge-loop", daemon=True)
+        self._thread.start()
+        self._wake: Optional[asyncio.Event] = None  # created on the loop (py<3.10 binds at init)
+        self._writer: Optional["asyncio.Task[None]"] = None
+        self._pending_outbound: List[Tuple[List[bytes], "asyncio.Future[bytes]"]] = []
+        self._pending: Deque["asyncio.Future[bytes]"] = deque()
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.framed = False
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)  # type: ignore[arg-type]
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def spawn(self, cmd: List[str]) -> bytes:
+        """Start Blender and return its (stripped) handshake line."""
+        await self._abandon()
+        self.proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=self.STREAM_LIMIT,
+        )
+        # Drain stderr in background (avoid deadlocks; keep MCP stdout clean)
+        self._loop.create_task(self._drain_stderr(self.proc))
+        assert self.proc.stdout
+        return (await self.proc.stdout.readline()).strip()
+
+    async def begin(self, framed: bool) -> None:
+        # Called once the handshake is accepted; responses are read from here on.
+        assert self.proc
+        self.framed = framed
+        self._wake = asyncio.Event()
+        self._loop.create_task(self._read_loop(self.proc))
+        self._writer = self._loop.create_task(self._write_loop(self.proc, self._wake))
+
+    async def _abandon(self) -> Optional[asyncio.subprocess.Process]:
+        """Detach the current process: stop its writer, drop unsent frames, fail waiting calls."""
+        proc, self.proc = self.proc, None
+        writer, self._writer = self._writer, None
+        if writer is not None and self._wake is not None:
+            self._wake.set()  # the writer exits once it sees self.proc changed
+            await asyncio.wait([writer], timeout=1.0)
+        self._pending_outbound = []  # never replay these to a restarted Blender
+        while self._pending:
+            fut = self._pending.popleft()
+            if not fut.done():
+                fut.set_result(b"")
+        return proc
+
+    async def _drain_stderr(self, proc: asyncio.subprocess.Process) -> None:
+        assert proc.stderr
+        while True:
+            try:
+                raw = await proc.stderr.readline()
+            except ValueError:
+                continue  # over-long line; the reader discarded it
+            except Exception:
+                return
+            if not raw:
+                return
+            line = raw.rstrip(b"\r\n")
+            if line.strip():
+                self._on_stderr(line)  # raw bytes; decoded only when someone reads it
+
+    async def request(self, data: bytes) -> bytes:
+        """Write one message and wait for its response (b"" if Blender went away)."""
+        assert self.proc and self._wake
+        fut: "asyncio.Future[bytes]" = self._loop.create_future()
+        if self.framed:
+            frames = [b"Content-Length: %d\r\n\r\n" % len(data), data]
+        else:
+            frames = [data, b"\n"]
+        # Both queues are appended together, so response order matches write order.
+        self._pending_outbound.append((frames, fut))
+        self._pending.append(fut)
+        self._wake.set()
+        return await fut
+
+    async def _write_loop(self, proc: asyncio.subprocess.Process, wake: asyncio.Event) -> None:
+        assert proc.stdin
+        while True:
+            await wake.wait()
+            wake.clear()
+            if proc is not self.proc:
+                return
+            # whatever was queued since the last wake goes out in one writelines()
+            batch, self._pending_outbound = self._pending_outbound, []
+            if not batch:
+                continue
+            try:
+                proc.stdin.writelines([chunk for frames, _ in batch for chunk in frames])
+                await proc.stdin.drain()
+            except Exception as ex:
+                for _, fut in batch:
+                    try:
+                        self._pending.remove(fut)
+                    except ValueError:
+                        pass
+                    if not fut.done():
+                        fut.set_exception(ex)
+
+    async def _read_message(self, stdout: asyncio.StreamReader) -> bytes:
+        if not self.framed:
+            return (await stdout.readline()).strip()
+
+        length = None
+        while True:
+            line = await stdout.readline()
+            if not line:
+                return b""
+            line = line.strip()
+            if not line:
+                if length is None:
+                    continue
+                break
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+        try:
+            return await stdout.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return b""
+
+    async def _read_loop(self, proc: asyncio.subprocess.Process) -> None:
+        assert proc.stdout
+        try:
+            while True:
+                out = await self._read_message(proc.stdout)
+                if not out:
+                    break
+                if self._pending:
+                    fut = self._pending.popleft()
+                    if not fut.done():
+                        fut.set_result(out)
+        except Exception as ex:
+            eprint("Provider read failed:", repr(ex))
+        finally:
+            if proc is self.proc:
+                self._pending_outbound = []  # never replay these to a restarted Blender
+                while self._pending:
+                    fut = self._pending.popleft()
+                    if not fut.done():
+                        fut.set_result(b"")
+
+    async def stop(self) -> None:
+        proc = await self._abandon()
+        if proc is None:
+            return
+        try:
+            if proc.stdin:
+                proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            proc.kill()
+        except Exception:
+            pass
 
 
 class HeadlessBlenderProvider:
     """
     Persistent headless Blender provider.
-    Starts Blender once, keeps it alive, exchanges JSONL (1 request line -> 1 response line).
+    Starts Blender once, keeps it alive, exchanges one response per request.
+    After the JSON-line handshake, messages use Content-Length framing when the bridge announces it
+    (older bridges keep plain JSONL).
+    Pipe I/O runs on a _BridgeLoop, so calls from several threads are pipelined to Blender in order.
     """
 
     def __init__(self) -> None:
         self.blender_exe = self._resolve_blender_exe()
-        self._proc: Optional[subprocess.Popen[str]] = None
-        self._lock = threading.Lock()
-        self._last_stderr_line: Optional[str] = None
+        self._io = _BridgeLoop(self._on_stderr)
+        self._lock = threading.Lock()  # guards (re)starting Blender
+        self._last_stderr_raw: Optional[bytes] = None
         self._bridge_path: Optional[str] = None
         self._start_blender()
 
     def _resolve_blender_exe(self) -> str:
         be = os.environ.get("BLENDER_EXE")
         if be and os.path.exists(be):
-            return be
+            return be  # one stat; nothing for the cache to save
 
-        candidates = [
-            r"C:\Program Files\Blender Foundation\Blender 5.0\blender.exe",
-            r"D:\Blender_5.0.0_Portable\blender.exe",
-        ]
-        for c in candidates:
+        cached = _read_exe_cache()
+        if cached:
+            return cached
+        for c in _BLENDER_CANDIDATES:
             if os.path.exists(c):
+                _write_exe_cache(c)
                 return c
 
         raise FileNotFoundError("Blender executable not found. Set BLENDER_EXE env var to blender.exe")
 
+    def _on_stderr(self, line: bytes) -> None:
+        self._last_stderr_raw = line
+        if _DEBUG:
+            eprint("[blender-stderr]", line.decode("utf-8", errors="replace"))
+
+    @property
+    def _last_stderr_line(self) -> Optional[str]:
+        raw = self._last_stderr_raw
+        return raw.decode("utf-8", errors="replace") if raw is not None else None
+
     def _start_blender(self) -> None:
-        if self._proc and self._proc.poll() is None:
+        if self._io.alive():
             return
 
         root = Path(__file__).resolve().parents[1]
@@ -54,42 +295,15 @@ class HeadlessBlenderProvider:
         self._bridge_path = bridge
         cmd = [self.blender_exe, "-b", "--factory-startup", "--python", bridge, "--"]
 
-        self._proc = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            bufsize=1,
-        )
-
-        assert self._proc.stdin and self._proc.stdout and self._proc.stderr
-
-        # Drain stderr in background (avoid deadlocks; keep MCP stdout clean)
-        def _drain_stderr(p: subprocess.Popen[str]) -> None:
-            try:
-                assert p.stderr
-                for line in p.stderr:
-                    line = line.rstrip("\n")
-                    if line.strip():
-                        self._last_stderr_line = line
-                        eprint("[blender-stderr]", line)
-            except Exception:
-                pass
-
-        threading.Thread(target=_drain_stderr, args=(self._proc,), daemon=True).start()
-
         # Handshake: first stdout line must be JSON
-        ready = self._proc.stdout.readline().strip()
+        ready = self._io.run(self._io.spawn(cmd))
         if not ready:
             raise RuntimeError(
                 f"Blender bridge did not send ready handshake. "
                 f"raw_line={ready!r} bridge={bridge!r} last_stderr={self._last_stderr_line!r}"
             )
         try:
-            obj = json.loads(ready)
+            obj = loads(ready)
         except Exception:
             raise RuntimeError(
                 f"Blender bridge sent invalid JSON handshake. "
@@ -97,20 +311,10 @@ class HeadlessBlenderProvider:
             )
         if not obj.get("ok") or obj.get("type") != "bridge_ready":
             raise RuntimeError(f"Unexpected handshake from Blender: {obj}")
+        self._io.run(self._io.begin(obj.get("framing") == "content-length"))
 
     def close(self) -> None:
-        if not self._proc:
-            return
-        try:
-            if self._proc.stdin:
-                self._proc.stdin.close()
-        except Exception:
-            pass
-        try:
-            self._proc.kill()
-        except Exception:
-            pass
-        self._proc = None
+        self._io.run(self._io.stop())
 
     def get_info(self) -> JSON:
         return {
@@ -119,13 +323,14 @@ class HeadlessBlenderProvider:
         }
 
     def health(self) -> JSON:
-        ok = self._proc is not None and self._proc.poll() is None
+        proc = self._io.proc
+        ok = self._io.alive()
         details: JSON = {
             "process_alive": ok,
         }
-        if self._proc is not None:
-            details["pid"] = self._proc.pid
-            details["returncode"] = self._proc.poll()
+        if proc is not None:
+            details["pid"] = proc.pid
+            details["returncode"] = proc.returncode
         if self._last_stderr_line:
             details["last_stderr_line"] = self._last_stderr_line
         return {"ok": True, "provider_ok": ok, "details": details}
@@ -133,30 +338,32 @@ class HeadlessBlenderProvider:
     def call(self, tool_name: str, tool_args: JSON) -> JSON:
         with self._lock:
             self._start_blender()
-            assert self._proc and self._proc.stdin and self._proc.stdout
+            proc = self._io.proc  # the process this request goes to
 
-            tool_map = {
-                "world_observe": "world.observe",
-                "world_reset": "world.reset",
-                "world_mutate": "world.mutate",
-                "world_observe_diff": "world.observe_diff",
-            }
-            req = {"tool": tool_map.get(tool_name, tool_name), "args": tool_args}
+        tool_map = {
+            "world_observe": "world.observe",
+            "world_reset": "world.reset",
+            "world_mutate": "world.mutate",
+            "world_observe_diff": "world.observe_diff",
+        }
+        req = {"tool": tool_map.get(tool_name, tool_name), "args": tool_args}
+        data = dumps(req)
 
-            try:
-                self._proc.stdin.write(json.dumps(req, ensure_ascii=False) + "\n")
-                self._proc.stdin.flush()
-            except Exception as ex:
-                eprint("Provider write failed, restarting Blender:", repr(ex))
-                self.close()
+        try:
+            out = self._io.run(self._io.request(data))
+        except Exception as ex:
+            with self._lock:
+                # Concurrent callers fail together when Blender dies; only the first one restarts
+                # it, the others retry on the fresh process instead of killing it again.
+                if self._io.proc is proc:
+                    eprint("Provider write failed, restarting Blender:", repr(ex))
+                    self.close()
                 self._start_blender()
-                assert self._proc and self._proc.stdin and self._proc.stdout
-                self._proc.stdin.write(json.dumps(req, ensure_ascii=False) + "\n")
-                self._proc.stdin.flush()
+            out = self._io.run(self._io.request(data))
 
-            out_line = self._proc.stdout.readline().strip()
-            if not out_line:
-                code = self._proc.poll() if self._proc else None
-                raise RuntimeError(f"Blender returned no output (exit={code}).")
+        if not out:
+            proc = self._io.proc
+            code = proc.returncode if proc else None
+            raise RuntimeError(f"Blender returned no output (exit={code}).")
 
-            return json.loads(out_line)
+        return loads(out)
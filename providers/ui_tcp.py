@@ -1,56 +1,157 @@
 # providers/ui_tcp.py
 from __future__ import annotations
 
-import json
 import socket
+import struct
+import threading
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, BinaryIO, Callable, Dict, NamedTuple, Optional, Tuple
+
+from ._common import dumps, loads
 
 JSON = Dict[str, Any]
 
+_LEN = struct.Struct(">I")
+# One-byte ping the bridge answers without any JSON work (framed bridges only).
+_PING_TAG = b"\x01"
+
+
+class _Conn(NamedTuple):
+    sock: socket.socket
+    rfile: BinaryIO
+    wfile: BinaryIO
+
 
 @dataclass
 class UiTcpConfig:
     host: str = "127.0.0.1"
     port: int = 61888
     timeout_s: float = 3.0
+    # 4-byte length-prefixed messages; False keeps newline-delimited JSON for older bridges
+    framed: bool = True
 
 
 class UiTcpBlenderProvider:
     """
     Provider that talks to a running Blender UI instance via the TCP bridge (ui_bridge_tcp.py).
-    Protocol: newline-delimited JSON request/response.
+    Protocol: length-prefixed (or newline-delimited, see UiTcpConfig.framed) JSON request/response.
+    Each calling thread keeps one warm connection and reuses it across calls.
     """
 
     def __init__(self, cfg: Optional[UiTcpConfig] = None):
         self.cfg = cfg or UiTcpConfig()
         self._snap_i = 0
+        self._tls = threading.local()
+        # ((scene_version, level), result) of the last observe; reused while the bridge's version is unchanged
+        self._observe_cache: Optional[Tuple[Tuple[Any, str], JSON]] = None
+        self._dispatch: Dict[str, Callable[[JSON], JSON]] = {
+            "system_info": self._call_system_info,
+            "world_health": self._call_health,
+            "world_reset": self._call_reset,
+            "world_observe": self._call_observe,
+            "world_mutate": self._call_mutate,
+            "world_observe_diff": self._call_observe_diff,
+        }
+
+    def _connect(self) -> _Conn:
+        # create_connection() minus the convenience: SO_RCVBUF must be set before connect(),
+        # since the TCP window scale it needs is fixed during the handshake
+        err: Optional[OSError] = None
+        for family, type_, proto, _name, addr in socket.getaddrinfo(
+            self.cfg.host, self.cfg.port, 0, socket.SOCK_STREAM
+        ):
+            s = socket.socket(family, type_, proto)
+            try:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)  # room for large observe replies
+                s.settimeout(self.cfg.timeout_s)
+                s.connect(addr)
+                break
+            except OSError as e:
+                s.close()
+                err = e
+        else:
+            raise err or OSError(f"getaddrinfo returned nothing for {self.cfg.host}")
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        conn = _Conn(s, s.makefile("rb", buffering=65536), s.makefile("wb", buffering=65536))
+        self._tls.conn = conn
+        return conn
+
+    def _drop(self) -> None:
+        conn = getattr(self._tls, "conn", None)
+        self._tls.conn = None
+        if conn is not None:
+            for f in (conn.rfile, conn.wfile, conn.sock):
+                try:
+                    f.close()
+                except OSError:
+                    pass
+
+    def _roundtrip(self, conn: _Conn, data: bytes) -> Tuple[bytes, bool]:
+        """Send one request; return (response payload, whether it arrived complete)."""
+        conn.wfile.write(data)
+        conn.wfile.flush()
+        if not self.cfg.framed:
+            line = conn.rfile.readline()
+            return line, line.endswith(b"\n")
+        header = conn.rfile.read(_LEN.size)
+        if len(header) < _LEN.size:
+            return header, False
+        (n,) = _LEN.unpack(header)
+        payload = conn.rfile.read(n)
+        return payload, len(payload) == n
+
+    def close(self) -> None:
+        self._drop()
 
     def _new_snapshot_id(self) -> str:
         self._snap_i += 1
         return f"U{self._snap_i}"
 
     def _send(self, method: str, params: Optional[JSON] = None) -> JSON:
-        req = {"method": method, "params": params or {}}
-        data = (json.dumps(req, ensure_ascii=False) + "\n").encode("utf-8")
-
-        with socket.create_connection((self.cfg.host, self.cfg.port), timeout=self.cfg.timeout_s) as s:
-            s.sendall(data)
-            buf = b""
-            while not buf.endswith(b"\n"):
-                chunk = s.recv(4096)
-                if not chunk:
-                    break
-                buf += chunk
-
-        raw = buf.decode("utf-8", errors="replace").strip()
+        if self.cfg.framed:
+            payload = _PING_TAG if method == "ping" and not params else dumps({"method": method, "params": params or {}})
+            data = _LEN.pack(len(payload)) + payload
+        else:
+            data = dumps({"method": method, "params": params or {}}) + b"\n"
+
+        conn = getattr(self._tls, "conn", None)
+        reused = conn is not None and conn.sock.fileno() != -1
+        if not reused:
+            conn = self._connect()
+        try:
+            buf, complete = self._roundtrip(conn, data)
+            if not buf and reused:
+                raise ConnectionResetError("UI bridge closed the pooled connection")
+        except socket.timeout:
+            self._drop()  # the bridge may still be working on it; never replay
+            raise
+        except OSError:
+            # A pooled socket may have gone stale (bridge restarted); reconnect once.
+            self._drop()
+            if not reused:
+                raise
+            try:
+                buf, complete = self._roundtrip(self._connect(), data)
+            except OSError:
+                self._drop()
+                raise
+        if not complete:
+            self._drop()  # short read: don't reuse a desynchronized stream
+
+        raw = buf.strip()
         if not raw:
             return {"ok": False, "error_type": "empty_response", "error_message": "UI bridge returned empty response."}
 
         try:
-            obj = json.loads(raw)
+            obj = loads(raw)
         except Exception as e:
-            return {"ok": False, "error_type": "json_decode", "error_message": str(e), "raw": raw}
+            return {
+                "ok": False,
+                "error_type": "json_decode",
+                "error_message": str(e),
+                "raw": raw.decode("utf-8", errors="replace"),
+            }
 
         # Normalize to ok envelope (bridge already does, but keep safe)
         if isinstance(obj, dict) and "ok" not in obj:
@@ -109,40 +210,56 @@ class UiTcpBlenderProvider:
         ok = bool(ping.get("ok"))
         return {"ok": ok, "provider_ok": ok, "details": ping}
 
-    def call(self, tool_name: str, tool_args: JSON) -> JSON:
-        if tool_name == "system_info":
-            return self.get_info()
-        if tool_name == "world_health":
-            return self.health()
-        if tool_name == "world_reset":
-            seed = int(tool_args.get("seed", 0)) if isinstance(tool_args, dict) else 0
-            out = self._send("world_reset", {"seed": seed})
-            if "ok" not in out:
-                out["ok"] = True
-            if "snapshot_id" not in out:
-                out["snapshot_id"] = self._new_snapshot_id()
-            return out
-        if tool_name == "world_observe":
-            level = tool_args.get("level", "compact") if isinstance(tool_args, dict) else "compact"
-            out = self._send("world_observe", {"level": level})
-            if "ok" not in out:
-                out["ok"] = True
-            if "snapshot_id" not in out:
-                out["snapshot_id"] = self._new_snapshot_id()
-            return out
-        if tool_name == "world_mutate":
-            dsl_version = tool_args.get("dsl_version") if isinstance(tool_args, dict) else None
-            batch = tool_args.get("batch") if isinstance(tool_args, dict) else None
-            out = self._send("world_mutate", {"dsl_version": dsl_version, "batch": batch})
-            if "ok" not in out:
-                out["ok"] = True
-            if "snapshot_id" not in out:
-                out["snapshot_id"] = self._new_snapshot_id()
+    # ---- tools/call dispatch ----
+
+    def _finalize(self, out: JSON) -> JSON:
+        if "ok" not in out:
+            out["ok"] = True
+        if "snapshot_id" not in out:
+            out["snapshot_id"] = self._new_snapshot_id()
+        return out
+
+    def _call_system_info(self, tool_args: JSON) -> JSON:
+        return self.get_info()
+
+    def _call_health(self, tool_args: JSON) -> JSON:
+        return self.health()
+
+    def _call_reset(self, tool_args: JSON) -> JSON:
+        seed = int(tool_args.get("seed", 0)) if isinstance(tool_args, dict) else 0
+        self._observe_cache = None
+        return self._finalize(self._send("world_reset", {"seed": seed}))
+
+    def _call_observe(self, tool_args: JSON) -> JSON:
+        level = tool_args.get("level", "compact") if isinstance(tool_args, dict) else "compact"
+        # Older bridges answer scene_version with ok:false; they simply never hit the cache.
+        version = self._send("scene_version", {}).get("scene_version")
+        cached = self._observe_cache
+        if version is not None and cached is not None and cached[0] == (version, level):
+            out = dict(cached[1])
+            out["snapshot_id"] = self._new_snapshot_id()
             return out
-        if tool_name == "world_observe_diff":
-            return {
-                "ok": False,
-                "error_type": "not_supported",
-                "error_message": "observe_diff not supported for ui_tcp provider yet.",
-            }
-        return {"ok": False, "error_type": "unknown_tool", "error_message": f"Unknown tool: {tool_name}"}
+
+        out = self._finalize(self._send("world_observe", {"level": level}))
+        if version is not None and out.get("ok"):
+            self._observe_cache = ((version, level), dict(out))
+        return out
+
+    def _call_mutate(self, tool_args: JSON) -> JSON:
+        dsl_version = tool_args.get("dsl_version") if isinstance(tool_args, dict) else None
+        batch = tool_args.get("batch") if isinstance(tool_args, dict) else None
+        self._observe_cache = None
+        return self._finalize(self._send("world_mutate", {"dsl_version": dsl_version, "batch": batch}))
+
+    def _call_observe_diff(self, tool_args: JSON) -> JSON:
+        return {
+            "ok": False,
+            "error_type": "not_supported",
+            "error_message": "observe_diff not supported for ui_tcp provider yet.",
+        }
+
+    def call(self, tool_name: str, tool_args: JSON) -> JSON:
+        handler = self._dispatch.get(tool_name)
+        if handler is None:
+            return {"ok": False, "error_type": "unknown_tool", "error_message": f"Unknown tool: {tool_name}"}
+        return handler(tool_args)
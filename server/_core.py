@@ -0,0 +1,507 @@
+# _core.py  (MCP stdio dispatcher shared by the entrypoints: run_mcp(provider, tool_config))
+from __future__ import annotations
+
+import functools
+import io
+import os
+import platform
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Union
+
+# _ENC produces UTF-8 bytes: responses are assembled and written as bytes.
+from providers._common import dumps as _ENC, eprint, loads as _DEC
+
+JSON = Dict[str, Any]
+
+# Fixed parts of a response; the id, result and tool payload are spliced in between.
+_ENVELOPE_PREFIX = b'{"jsonrpc":"2.0","id":'
+_ENVELOPE_RESULT = b',"result":'
+_ENVELOPE_MID = b',"result":{"content":[{"type":"text","text":'
+_ENVELOPE_SUFFIX = b"}]}}"
+
+
+# Binary stdio with larger buffers than the text layer; set up by _open_stdio() in main().
+_in: Optional[io.BufferedReader] = None
+_out: Optional[io.BufferedWriter] = None
+
+# Opt-in LSP-style framing ("Content-Length: N\r\n\r\n" + N bytes). Detected from the first
+# framed message a client sends; from then on responses are framed the same way.
+_framed = False
+
+
+def _open_stdio() -> None:
+    global _in, _out
+    sys.stdout.flush()
+    # under -u / PYTHONUNBUFFERED stdout.buffer is already the raw FileIO
+    _in = io.BufferedReader(getattr(sys.stdin.buffer, "raw", sys.stdin.buffer), buffer_size=262144)
+    _out = io.BufferedWriter(getattr(sys.stdout.buffer, "raw", sys.stdout.buffer), buffer_size=65536)
+
+
+def _read_framed_body(first_header: bytes) -> Optional[bytes]:
+    # Headers end at a blank line; the body is then one exact-length read, no newline scan.
+    assert _in is not None
+    length = int(first_header.partition(b":")[2])
+    while True:
+        line = _in.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    body = _in.read(length)
+    return body if len(body) == length else None
+
+
+def read_json_line() -> Optional[Union[JSON, List[JSON]]]:
+    global _framed
+    assert _in is not None
+    line = _in.readline()
+    if not line:
+        return None
+    if line[:15].lower() == b"content-length:":
+        _framed = True
+        body = _read_framed_body(line)
+        if body is None:
+            return None
+        return _DEC(body)
+    line = line.strip()
+    if not line:
+        return None
+    return _DEC(line)  # bytes in, no TextIOWrapper decode
+
+
+# A response is either a dict or an already serialized JSON object (UTF-8 bytes).
+Response = Union[JSON, bytes]
+
+
+def _encode(obj: Response) -> bytes:
+    return obj if isinstance(obj, bytes) else _ENC(obj)
+
+
+def write_json(obj: Union[Response, List[Response]], flush: bool = True) -> None:
+    # IMPORTANT: stdout must be JSON-RPC ONLY
+    assert _out is not None
+    if isinstance(obj, list):
+        body = b"[" + b",".join(map(_encode, obj)) + b"]"
+    else:
+        body = _encode(obj)
+    if _framed:
+        _out.write(b"Content-Length: %d\r\n\r\n" % len(body))
+        _out.write(body)
+    else:
+        _out.write(body)
+        _out.write(b"\n")
+    if flush:
+        _out.flush()
+
+
+def _default_tool_specs() -> List[JSON]:
+    return [
+        {
+            "name": "world_observe",
+            "description": "Return a compact snapshot of the current Blender scene (persistent headless).",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "level": {"type": "string", "enum": ["compact"], "default": "compact"},
+                },
+                "additionalProperties": False,
+            },
+        },
+        {
+            "name": "world_reset",
+            "description": "Reset the Blender scene to empty (dev tool).",
+            "inputSchema": {
+                "type": "object",
+                "properties": {"seed": {"type": "integer", "default": 0}},
+                "additionalProperties": False,
+            },
+        },
+        {
+            "name": "world_mutate",
+            "description": "Apply a batch of actions (DSL v1). V3 supports primitives, transforms, delete, collections.",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "dsl_version": {"type": "string", "enum": ["1.0"]},
+                    "batch": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "op": {"type": "string"},
+                                "args": {"type": "object"},
+                            },
+                            "required": ["op", "args"],
+                            "additionalProperties": False,
+                        },
+                    },
+                },
+                "required": ["dsl_version", "batch"],
+                "additionalProperties": False,
+            },
+        },
+        {
+            "name": "world_observe_diff",
+            "description": "Compute a semantic diff between two snapshot_ids returned by world_observe/world_mutate.",
+            "inputSchema": {
+                "type": "object",
+                "properties": {"from": {"type": "string"}, "to": {"type": "string"}},
+                "required": ["from", "to"],
+                "additionalProperties": False,
+            },
+        },
+        {
+            "name": "system_info",
+            "description": "Return runtime info for server/provider (versions, paths, blender exe).",
+            "inputSchema": {
+                "type": "object",
+                "properties": {},
+                "additionalProperties": False,
+            },
+        },
+        {
+            "name": "world_health",
+            "description": "Health check for the persistent Blender provider.",
+            "inputSchema": {
+                "type": "object",
+                "properties": {},
+                "additionalProperties": False,
+            },
+        },
+    ]
+
+
+@dataclass
+class ToolConfig:
+    """
+    What an entrypoint exposes: the MCP tool specs and which of them touch the scene
+    (those run one at a time, in arrival order). The tools/list payload is serialized once here.
+    """
+
+    tools: List[JSON]
+    world_tools: FrozenSet[str]
+    allowed_tools: FrozenSet[str] = field(init=False)
+    tools_list_fragment: bytes = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.tools = sorted(self.tools, key=lambda t: t.get("name", ""))
+        self.allowed_tools = frozenset(t["name"] for t in self.tools)
+        self.tools_list_fragment = _ENC({"tools": self.tools})
+
+
+DEFAULT_TOOL_CONFIG = ToolConfig(
+    tools=_default_tool_specs(),
+    world_tools=frozenset({"world_observe", "world_reset", "world_mutate", "world_observe_diff"}),
+)
+
+# The other list payloads are static too.
+_RESOURCES_LIST_JSON_FRAGMENT = b'{"resources":[]}'
+_PROMPTS_LIST_JSON_FRAGMENT = b'{"prompts":[]}'
+
+
+def _result_line(_id: Any, fragment: bytes) -> bytes:
+    return _ENVELOPE_PREFIX + _ENC(_id) + _ENVELOPE_RESULT + fragment + b"}"
+
+
+def _tool_result_line(_id: Any, payload: JSON) -> bytes:
+    # MCP carries the tool payload as a JSON string: encode it once, then quote that text.
+    inner = _ENC(payload).decode("utf-8")
+    return _ENVELOPE_PREFIX + _ENC(_id) + _ENVELOPE_MID + _ENC(inner) + _ENVELOPE_SUFFIX
+
+
+def _normalize_ok(payload: Any) -> JSON:
+    if isinstance(payload, dict):
+        if "ok" in payload:
+            return payload
+        out = {"ok": True}
+        out.update(payload)
+        return out
+    return {"ok": True, "value": payload}
+
+
+def _error_payload(ex: Exception, trace: Optional[str]) -> JSON:
+    out: JSON = {
+        "ok": False,
+        "error_type": type(ex).__name__,
+        "error_message": str(ex),
+    }
+    if trace:
+        out["trace"] = trace
+    return out
+
+
+def _short_trace() -> Optional[str]:
+    tb = traceback.format_exc()
+    if not tb:
+        return None
+    lines = tb.splitlines()
+    return "\n".join(lines[:20])
+
+
+# ---- JSON-RPC method handlers: (id, params, session) -> response, or None for notifications ----
+
+Reply = Union[Response, "Future[Response]", None]
+
+
+@dataclass
+class _Session:
+    """Minimal MCP session state shared by the handlers."""
+
+    provider: Any
+    config: ToolConfig
+    pool: ThreadPoolExecutor
+    world_pool: ThreadPoolExecutor
+    initialized: bool = False
+    negotiated_protocol: str = "2024-11-05"  # safe default
+    stop: bool = False
+    provider_info: Optional[Tuple[float, JSON]] = None  # (monotonic time, get_info())
+
+
+def _h_initialize(_id: Any, params: JSON, state: _Session) -> Reply:
+    # Client proposes protocolVersion; we accept and echo a compatible one
+    pv = params.get("protocolVersion")
+    if isinstance(pv, str) and pv.strip():
+        state.negotiated_protocol = pv.strip()
+
+    state.initialized = True
+    return {
+        "jsonrpc": "2.0",
+        "id": _id,
+        "result": {
+            "protocolVersion": state.negotiated_protocol,
+            "serverInfo": {"name": "mcp_world1", "version": "0.3.1"},
+            "capabilities": {
+                "tools": {"listChanged": False},
+                "resources": {"listChanged": False},
+                "prompts": {"listChanged": False},
+                "logging": {},
+            },
+        },
+    }
+
+
+def _h_noop(_id: Any, params: JSON, state: _Session) -> Reply:
+    # Claude sends notifications/initialized with no id; no response
+    return None
+
+
+def _h_shutdown(_id: Any, params: JSON, state: _Session) -> Reply:
+    state.stop = True
+    # answer only after every in-flight tool call has been written
+    state.pool.shutdown(wait=True)
+    state.world_pool.shutdown(wait=True)
+    return {"jsonrpc": "2.0", "id": _id, "result": None}
+
+
+def _h_resources_list(_id: Any, params: JSON, state: _Session) -> Reply:
+    return _result_line(_id, _RESOURCES_LIST_JSON_FRAGMENT)
+
+
+def _h_prompts_list(_id: Any, params: JSON, state: _Session) -> Reply:
+    return _result_line(_id, _PROMPTS_LIST_JSON_FRAGMENT)
+
+
+def _h_tools_list(_id: Any, params: JSON, state: _Session) -> Reply:
+    # Some hosts call tools/list before/after initialize; we allow it anyway.
+    return _result_line(_id, state.config.tools_list_fragment)
+
+
+@functools.lru_cache(maxsize=1)
+def _server_static_info() -> JSON:
+    # Fixed for the life of the process.
+    return {
+        "python_version": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cwd": os.getcwd(),
+    }
+
+
+# provider.get_info() may ping Blender (ui_tcp); reuse it for a few seconds.
+PROVIDER_INFO_TTL_S = 5.0
+
+
+def _provider_info(state: _Session) -> JSON:
+    now = time.monotonic()
+    cached = state.provider_info
+    if cached is not None and now - cached[0] < PROVIDER_INFO_TTL_S:
+        return cached[1]
+    info = state.provider.get_info()
+    state.provider_info = (now, info)
+    return info
+
+
+def _run_tool(state: _Session, tool_name: str, tool_args: JSON, _id: Any) -> Response:
+    provider = state.provider
+    try:
+        if tool_name == "system_info":
+            payload = {"ok": True, "server": _server_static_info(), "provider": _provider_info(state)}
+        elif tool_name == "world_health":
+            payload = provider.health()
+            payload = _normalize_ok(payload)
+        else:
+            out = provider.call(tool_name, tool_args)
+            payload = _normalize_ok(out)
+    except Exception as ex:
+        payload = _error_payload(ex, _short_trace())
+
+    try:
+        return _tool_result_line(_id, payload)
+    except Exception as ex:
+        eprint("Server error:", repr(ex))
+        return {"jsonrpc": "2.0", "id": _id, "error": {"code": -32000, "message": "Internal server error"}}
+
+
+def _h_tools_call(_id: Any, params: JSON, state: _Session) -> Reply:
+    tool_name = params.get("name")
+    tool_args = params.get("arguments") or {}
+
+    if tool_name not in state.config.allowed_tools:
+        payload = {
+            "ok": False,
+            "error_type": "UnknownTool",
+            "error_message": f"Unknown tool: {tool_name}",
+        }
+        return _tool_result_line(_id, payload)
+
+    # Runs off the read loop so pipelined requests overlap. World tools share one worker to keep
+    # their order against Blender; system_info/world_health use the pool.
+    executor = state.world_pool if tool_name in state.config.world_tools else state.pool
+    return executor.submit(_run_tool, state, tool_name, tool_args, _id)
+
+
+def _unknown_method(_id: Any, method: Any) -> JSON:
+    return {
+        "jsonrpc": "2.0",
+        "id": _id,
+        "error": {"code": -32601, "message": f"Unknown method: {method}"},
+    }
+
+
+HANDLERS: Dict[str, Callable[[Any, JSON, _Session], Reply]] = {
+    # --- MCP handshake (Claude Desktop expects this) ---
+    "initialize": _h_initialize,
+    "notifications/initialized": _h_noop,
+    # Optional but sometimes used
+    "shutdown": _h_shutdown,
+    # --- Optional lists Claude might call ---
+    "resources/list": _h_resources_list,
+    "prompts/list": _h_prompts_list,
+    # --- Your tools ---
+    "tools/list": _h_tools_list,
+    "tools/call": _h_tools_call,
+}
+
+
+def run_mcp(provider: Any, tool_config: ToolConfig = DEFAULT_TOOL_CONFIG) -> None:
+    """Serve MCP over stdio until EOF or shutdown, dispatching tools/call to `provider`."""
+    # UTF-8 safety on Windows (stderr only; JSON-RPC goes through the binary buffers)
+    try:
+        sys.stderr.reconfigure(encoding="utf-8")
+    except Exception:
+        pass
+    _open_stdio()
+
+    state = _Session(
+        provider=provider,
+        config=tool_config,
+        pool=ThreadPoolExecutor(max_workers=8, thread_name_prefix="mcp-tool"),
+        world_pool=ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcp-world"),
+    )
+    write_lock = threading.Lock()
+    # Writers queued behind write_lock; only the last one of a burst flushes stdout.
+    queued = [0]
+    queued_lock = threading.Lock()
+
+    # Hot-path globals bound as locals (LOAD_FAST in the per-message code).
+    _read = read_json_line
+    _write = write_json
+    _handlers = HANDLERS
+    _is_future = Future
+
+    def emit(obj: Union[Response, List[Response]]) -> None:
+        # stdout lines must never interleave
+        with queued_lock:
+            queued[0] += 1
+        with write_lock:
+            with queued_lock:
+                queued[0] -= 1
+                last = queued[0] == 0
+            _write(obj, flush=last)
+
+    def safe_handle(msg: Any) -> Reply:
+        try:
+            if not isinstance(msg, dict):
+                return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+            msg_get = msg.get
+            method = msg_get("method")
+            _id = msg_get("id")
+            # Notifications (no "id") are never answered, in or out of a batch, not even with an error.
+            is_request = "id" in msg
+            h = _handlers.get(method) if isinstance(method, str) else None
+            if h is None:
+                return _unknown_method(_id, method) if is_request else None
+            resp = h(_id, msg_get("params") or {}, state)
+            return resp if is_request else None
+        except Exception as ex:
+            eprint("Server error:", repr(ex))
+            eprint(traceback.format_exc())
+            if not (isinstance(msg, dict) and "id" in msg):
+                return None
+            return {"jsonrpc": "2.0", "id": msg["id"], "error": {"code": -32000, "message": "Internal server error"}}
+
+    def emit_batch(items: List[Union[Response, "Future[Response]"]]) -> None:
+        # The batch array goes out once its last pending tool call completes.
+        futures = [r for r in items if isinstance(r, _is_future)]
+        if not futures:
+            if items:
+                emit(items)  # type: ignore[arg-type]
+            return
+        remaining = [len(futures)]
+        count_lock = threading.Lock()
+
+        def _one_done(_f: "Future[Response]") -> None:
+            with count_lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            emit([r.result() if isinstance(r, _is_future) else r for r in items])
+
+        for f in futures:
+            f.add_done_callback(_one_done)
+
+    while not state.stop:
+        try:
+            msg = _read()
+        except Exception as ex:
+            eprint("Server error:", repr(ex))
+            emit({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+            continue
+        if msg is None:
+            break
+
+        # JSON-RPC 2.0 batch: one array in, one array out (notifications contribute nothing).
+        if isinstance(msg, list):
+            if not msg:
+                emit({"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}})
+                continue
+            emit_batch([r for r in map(safe_handle, msg) if r is not None])
+            continue
+
+        resp = safe_handle(msg)
+        if isinstance(resp, _is_future):
+            resp.add_done_callback(lambda f: emit(f.result()))
+        elif resp is not None:
+            emit(resp)
+
+    state.pool.shutdown(wait=True)
+    state.world_pool.shutdown(wait=True)
+
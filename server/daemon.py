@@ -0,0 +1,205 @@
+# daemon.py  (keeps one MCP server alive across agent/client runs)
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import List, Optional
+
+from providers._common import eprint
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    _loads = json.loads
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Unix socket on POSIX, named pipe on Windows; override with TORR_DAEMON_ADDRESS.
+if sys.platform == "win32":
+    DEFAULT_ADDRESS = r"\\.\pipe\torr_mcp"
+else:
+    DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), "torr_mcp.sock")
+
+
+def daemon_address() -> str:
+    return os.environ.get("TORR_DAEMON_ADDRESS", DEFAULT_ADDRESS)
+
+
+def _expects_reply(raw: bytes) -> bool:
+    # Mirrors the server: notifications (no id) get no response line, while parse errors,
+    # invalid requests (non-objects, empty batches) and anything with an id do.
+    try:
+        msg = _loads(raw)
+    except Exception:
+        return True
+    if isinstance(msg, list):
+        return not msg or any(not isinstance(m, dict) or "id" in m for m in msg)
+    return not isinstance(msg, dict) or "id" in msg
+
+
+class McpDaemon:
+    """
+    Owns one `python -m server.mcp_server` child and relays JSON-RPC lines to it
+    from any number of local connections, one request/response pair at a time.
+    """
+
+    def __init__(self, address: Optional[str] = None) -> None:
+        self.address = address or daemon_address()
+        self._child_lock = threading.Lock()
+        self._child: Optional[subprocess.Popen[bytes]] = None
+        self._listener: Optional[Listener] = None
+
+    def _ensure_child(self) -> subprocess.Popen[bytes]:
+        if self._child is None or self._child.poll() is not None:
+            self._child = subprocess.Popen(
+                [sys.executable, "-m", "server.mcp_server"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                cwd=str(ROOT),
+            )
+        return self._child
+
+    def _relay(self, raw: bytes) -> Optional[bytes]:
+        with self._child_lock:
+            child = self._ensure_child()
+            assert child.stdin and child.stdout
+            child.stdin.write(raw.rstrip(b"\n") + b"\n")
+            child.stdin.flush()
+            if not _expects_reply(raw):
+                return None
+            line = child.stdout.readline()
+            if not line:
+                raise RuntimeError(f"MCP server exited (code={child.poll()})")
+            return line.rstrip(b"\r\n")
+
+    def _serve_conn(self, conn: Connection) -> None:
+        try:
+            while True:
+                try:
+                    raw = conn.recv_bytes()
+                except (EOFError, OSError):
+                    break
+                out = self._relay(raw)
+                if out is not None:
+                    conn.send_bytes(out)
+        except Exception as ex:
+            eprint("[daemon] connection error:", repr(ex))
+        finally:
+            conn.close()
+
+    def _remove_stale_socket(self) -> None:
+        if sys.platform == "win32" or not os.path.exists(self.address):
+            return
+        try:
+            Client(self.address).close()
+        except OSError:
+            os.unlink(self.address)  # left behind by a daemon that died
+
+    def close(self) -> None:
+        # Stop accepting; connected agents finish their current request.
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except OSError:
+                pass
+
+    def serve_forever(self) -> None:
+        self._remove_stale_socket()
+        self._listener = Listener(self.address)
+        self._ensure_child()
+        eprint(f"[daemon] listening on {self.address}")
+
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except OSError:
+                    break
+                threading.Thread(target=self._serve_conn, args=(conn,), daemon=True).start()
+        finally:
+            self._stop_child()
+
+    def _stop_child(self) -> None:
+        with self._child_lock:
+            if self._child is None or self._child.stdin is None:
+                return
+            self._child.stdin.close()  # server exits on EOF
+            try:
+                self._child.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._child.kill()
+
+
+# ---- client side: a Popen look-alike so existing send() helpers keep working ----
+
+
+class _PipeWriter:
+    def __init__(self, conn: Connection) -> None:
+        self._conn = conn
+        self._buf: List[str] = []
+
+    def write(self, s: str) -> int:
+        self._buf.append(s)
+        return len(s)
+
+    def flush(self) -> None:
+        data = "".join(self._buf)
+        self._buf.clear()
+        for line in data.splitlines():
+            if line.strip():
+                self._conn.send_bytes(line.encode("utf-8"))
+
+
+class _PipeReader:
+    def __init__(self, conn: Connection) -> None:
+        self._conn = conn
+
+    def readline(self) -> str:
+        try:
+            return self._conn.recv_bytes().decode("utf-8") + "\n"
+        except EOFError:
+            return ""
+
+
+class DaemonSession:
+    def __init__(self, conn: Connection) -> None:
+        self._conn = conn
+        self.stdin = _PipeWriter(conn)
+        self.stdout = _PipeReader(conn)
+
+    def terminate(self) -> None:
+        # Only drops this connection; the daemon and its MCP server stay up.
+        self._conn.close()
+
+    kill = terminate
+
+
+def connect(address: Optional[str] = None) -> Optional[DaemonSession]:
+    """Return a session on a running daemon, or None if none is listening."""
+    try:
+        return DaemonSession(Client(address or daemon_address()))
+    except OSError:
+        return None
+
+
+def main() -> None:
+    daemon = McpDaemon()
+    signal.signal(signal.SIGTERM, lambda *_: daemon.close())
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
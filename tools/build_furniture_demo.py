@@ -5,8 +5,18 @@
 import os
 import bpy
 import bmesh
+import numpy as np
 from mathutils import Vector
 
+try:
+    from numba import njit
+except ImportError:
+    # numba n'est pas livré avec Blender : les noyaux restent du NumPy pur
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
 BASE_OUT = r"D:\MCP_WORLD1\out"
 BLEND_OUT = os.path.join(BASE_OUT, "furniture_demo.blend")
 
@@ -29,18 +39,33 @@ def ensure_collection(name: str) -> bpy.types.Collection:
     return coll
 
 
-def create_cube_mesh(name: str) -> bpy.types.Mesh:
+def create_cube_mesh(name: str, shade_smooth: bool = False) -> bpy.types.Mesh:
     me = bpy.data.meshes.new(name + "_Mesh")
     bm = bmesh.new()
     bmesh.ops.create_cube(bm, size=2.0)  # cube "unit" centered, edge length 2
     bm.to_mesh(me)
     bm.free()
+    if shade_smooth:
+        # un seul transfert C au lieu d'un setter RNA par face
+        me.polygons.foreach_set("use_smooth", np.ones(len(me.polygons), dtype=bool))
+    return me
+
+
+# Un seul cube partagé par toutes les pièces (un par mode de lissage) : la taille vient de obj.scale,
+# le bevel est un modificateur, donc aucune pièce n'a besoin de sa propre géométrie.
+_UNIT_CUBES = {}
+
+
+def unit_cube_mesh(shade_smooth: bool) -> bpy.types.Mesh:
+    me = _UNIT_CUBES.get(shade_smooth)
+    if me is None:
+        me = create_cube_mesh("UnitCube_Smooth" if shade_smooth else "UnitCube", shade_smooth)
+        _UNIT_CUBES[shade_smooth] = me
     return me
 
 
 def create_part(coll: bpy.types.Collection, name: str, location, scale, bevel=0.02, shade_smooth=True):
-    me = create_cube_mesh(name)
-    obj = bpy.data.objects.new(name, me)
+    obj = bpy.data.objects.new(name, unit_cube_mesh(shade_smooth))
     coll.objects.link(obj)
 
     obj.location = Vector(location)
@@ -54,13 +79,31 @@ def create_part(coll: bpy.types.Collection, name: str, location, scale, bevel=0.
     mod.limit_method = 'ANGLE'
     mod.angle_limit = 0.610865  # 35 deg
 
-    if shade_smooth:
-        for p in me.polygons:
-            p.use_smooth = True
-
     return obj
 
 
+# ordre des pieds (avant/arrière x gauche/droite) et signe de leur décalage (x, y)
+LEG_SUFFIXES = ("FL", "FR", "BL", "BR")
+_LEG_SIGNS = np.array([[+1, +1], [-1, +1], [+1, -1], [-1, -1]], dtype=np.float64)
+
+
+# pas de cache=True : lancé depuis l'éditeur de texte de Blender, le script n'a pas de fichier où le poser
+@njit(fastmath=True)
+def _leg_positions(origins, lx, ly, leg_z):
+    out = np.empty((origins.shape[0], 4, 3))
+    for k in range(4):
+        out[:, k, 0] = origins[:, 0] + _LEG_SIGNS[k, 0] * lx
+        out[:, k, 1] = origins[:, 1] + _LEG_SIGNS[k, 1] * ly
+        out[:, k, 2] = origins[:, 2] + leg_z
+    return out
+
+
+def leg_positions(origins, lx: float, ly: float, leg_z: float) -> np.ndarray:
+    """Positions (N, 4, 3) des 4 pieds pour N origines, calculées d'un bloc (compilé si numba est là)."""
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    return _leg_positions(origins, float(lx), float(ly), float(leg_z))
+
+
 def build_chair(coll: bpy.types.Collection, origin=(0, 0, 0)):
     ox, oy, oz = origin
 
@@ -89,17 +132,11 @@ def build_chair(coll: bpy.types.Collection, origin=(0, 0, 0)):
     # legs (4 corners)
     lx = (seat_w/2 - leg_w/2) * 0.95
     ly = (seat_d/2 - leg_w/2) * 0.95
-    leg_z = oz + (leg_h/2)
-
-    for name, x, y in [
-        ("Chair_Leg_FL", +lx, +ly),
-        ("Chair_Leg_FR", -lx, +ly),
-        ("Chair_Leg_BL", +lx, -ly),
-        ("Chair_Leg_BR", -lx, -ly),
-    ]:
+
+    for suffix, loc in zip(LEG_SUFFIXES, leg_positions(origin, lx, ly, leg_h/2)[0].tolist()):
         create_part(
-            coll, name,
-            location=(ox + x, oy + y, leg_z),
+            coll, "Chair_Leg_" + suffix,
+            location=loc,
             scale=(leg_w/2, leg_w/2, leg_h/2),
             bevel=0.01
         )
@@ -135,17 +172,11 @@ def build_bench(coll: bpy.types.Collection, origin=(1.2, 0, 0)):
     # 4 legs (reculées un peu vers les bords)
     lx = (seat_w/2 - leg_w/2) * 0.93
     ly = (seat_d/2 - leg_w/2) * 0.92
-    leg_z = oz + (leg_h/2)
-
-    for name, x, y in [
-        ("Bench_Leg_FL", +lx, +ly),
-        ("Bench_Leg_FR", -lx, +ly),
-        ("Bench_Leg_BL", +lx, -ly),
-        ("Bench_Leg_BR", -lx, -ly),
-    ]:
+
+    for suffix, loc in zip(LEG_SUFFIXES, leg_positions(origin, lx, ly, leg_h/2)[0].tolist()):
         create_part(
-            coll, name,
-            location=(ox + x, oy + y, leg_z),
+            coll, "Bench_Leg_" + suffix,
+            location=loc,
             scale=(leg_w/2, leg_w/2, leg_h/2),
             bevel=0.01
         )
@@ -1,19 +1,32 @@
 import json
 import socket
+import struct
 
 HOST = "127.0.0.1"
 PORT = 61888
 
+_LEN = struct.Struct(">I")
+
+def recv_exact(s, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        r = s.recv_into(view[got:])
+        if not r:
+            raise ConnectionError("UI bridge closed the connection")
+        got += r
+    return buf
+
 def send(obj):
+    payload = json.dumps(obj).encode("utf-8")
     with socket.create_connection((HOST, PORT), timeout=3) as s:
-        s.sendall((json.dumps(obj) + "\n").encode("utf-8"))
-        data = b""
-        while not data.endswith(b"\n"):
-            chunk = s.recv(4096)
-            if not chunk:
-                break
-            data += chunk
-    return json.loads(data.decode("utf-8").strip())
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        s.sendall(_LEN.pack(len(payload)) + payload)
+        (n,) = _LEN.unpack(recv_exact(s, _LEN.size))
+        data = recv_exact(s, n)
+    return json.loads(data.decode("utf-8"))
 
 print(send({"method": "ping", "params": {}}))
 print(send({"method": "world_observe", "params": {}}))
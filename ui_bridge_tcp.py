@@ -1,180 +1,579 @@
 # ui_bridge_tcp.py
 # Run inside Blender (UI) via: Blender > Scripting > Run Script
-# Opens a local TCP server that receives JSON lines and replies with JSON lines.
+# Opens a local TCP server that receives JSON messages and replies in kind: either
+# newline-delimited, or prefixed with a 4-byte big-endian length (framed). A connection
+# is framed when its first byte is 0x00, i.e. the high byte of the first length prefix.
+# Framed requests larger than MAX_FRAME_SIZE are answered with a frame_too_large error
+# and the connection is closed.
 
 import json
+import queue
+import selectors
 import socket
+import struct
 import threading
+import time
 import traceback
 
 import bpy
+import numpy as np
+
+try:
+    import orjson  # not bundled with Blender; pip-install into Blender's Python to enable
+except ImportError:
+    orjson = None
 
 HOST = "127.0.0.1"
 PORT = 61888
 
-def _json_reply(sock, obj):
-    data = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
-    sock.sendall(data)
+_LEN = struct.Struct(">I")
+# Keeps the first byte of every length prefix 0x00, and bounds what a peer can make us buffer.
+MAX_FRAME_SIZE = (1 << 24) - 1
 
-def _handle_request(req):
+# world_observe reads transforms in bulk (foreach_get) from this many objects on.
+VECTORIZE_MIN_OBJECTS = 64
+_OBSERVED_TYPES = {"MESH", "EMPTY", "LIGHT", "CAMERA"}
+
+# Requests are parsed on the socket thread but run on Blender's main thread (bpy is not
+# thread-safe): (client, request, ready-made response) tuples drained by a timer.
+_requests = queue.SimpleQueue()
+# Timer interval while idle; the socket thread has no way to wake the timer early.
+DRAIN_IDLE_INTERVAL_S = 0.01
+# After a request, poll at DRAIN_HOT_INTERVAL_S for this long: a client's next request
+# usually follows its reply within a round trip. Nonzero so the main thread never spins.
+DRAIN_HOT_WINDOW_S = 0.25
+DRAIN_HOT_INTERVAL_S = 0.002
+_last_request_t = 0.0
+# Set by world_mutate; all batches drained in one tick share one view layer update.
+_view_layer_dirty = False
+# Responses go back as (client, response); the socket thread encodes and sends them,
+# so the main thread only pays for the bpy work. One byte on _wake_w wakes its selector.
+_replies = queue.SimpleQueue()
+_wake_r, _wake_w = socket.socketpair()
+_wake_r.setblocking(False)
+_wake_w.setblocking(False)
+
+# Bumped on every depsgraph update (UI edits included), every frame change (animated
+# transforms move without one) and by our own mutations; providers compare it to skip
+# re-observing an unchanged scene.
+_scene_version = 0
+
+# persistent: loading a .blend must not drop it while the persistent drain timer keeps
+# serving requests, or the version would freeze and providers serve stale observes
+@bpy.app.handlers.persistent
+def _bump_scene_version(*_args):
+    global _scene_version
+    _scene_version += 1
+
+def _install_scene_version_handler():
+    for handlers in (bpy.app.handlers.depsgraph_update_post, bpy.app.handlers.frame_change_post):
+        # re-running the script must not stack handlers
+        for h in [h for h in handlers if getattr(h, "__name__", "") == _bump_scene_version.__name__]:
+            handlers.remove(h)
+        handlers.append(_bump_scene_version)
+
+# Shared mesh for add_cube: edge length 1 centered on the origin, so size s -> scale s.
+_UNIT_CUBE = None
+_CUBE_VERTS_NP = np.array([
+    -0.5, -0.5, -0.5,  -0.5, -0.5, 0.5,  -0.5, 0.5, -0.5,  -0.5, 0.5, 0.5,
+    0.5, -0.5, -0.5,   0.5, -0.5, 0.5,   0.5, 0.5, -0.5,   0.5, 0.5, 0.5,
+], dtype=np.float32)
+# quads wound outward: -X, +X, -Y, +Y, -Z, +Z
+_CUBE_LOOP_VIDX = np.array([
+    0, 1, 3, 2,  4, 6, 7, 5,  0, 4, 5, 1,
+    2, 3, 7, 6,  0, 2, 6, 4,  1, 5, 7, 3,
+], dtype=np.int32)
+_CUBE_LOOP_START = np.arange(0, 24, 4, dtype=np.int32)
+_CUBE_LOOP_TOTAL = np.full(6, 4, dtype=np.int32)
+
+def _unit_cube():
+    global _UNIT_CUBE
+    if _UNIT_CUBE is not None:
+        try:
+            _UNIT_CUBE.name  # raises ReferenceError once the datablock was removed
+            return _UNIT_CUBE
+        except ReferenceError:
+            _UNIT_CUBE = None
+    me = bpy.data.meshes.new("_torr_unit_cube")
+    # filled straight from the templates: no bmesh round-trip
+    me.vertices.add(8)
+    me.loops.add(24)
+    me.polygons.add(6)
+    me.vertices.foreach_set("co", _CUBE_VERTS_NP)
+    me.loops.foreach_set("vertex_index", _CUBE_LOOP_VIDX)
+    me.polygons.foreach_set("loop_start", _CUBE_LOOP_START)
+    # Blender 4.x derives loop_total from loop_start (read-only); older versions need it set.
+    # The flag lives on the element struct; me.polygons.bl_rna is the collection's.
+    if not bpy.types.MeshPolygon.bl_rna.properties["loop_total"].is_readonly:
+        me.polygons.foreach_set("loop_total", _CUBE_LOOP_TOTAL)
+    me.update(calc_edges=True)
+    _UNIT_CUBE = me
+    return me
+
+# stdlib fallback: one compact encoder/decoder instead of re-parsing kwargs per call
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_DECODER = json.JSONDecoder()
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _ENCODER.encode(obj).encode("utf-8")
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return _DECODER.decode(str(data, "utf-8"))
+
+# A request whose first byte is PING_TAG (never the start of a JSON text) is a ping
+# answered straight from the socket thread with these pre-encoded bytes, no JSON work.
+PING_TAG = 0x01
+_PING_RESULT = {"ok": True, "pong": True, "blender": bpy.app.version_string}
+_PING_BODY = _dumps(_PING_RESULT)
+_PING_REPLY = {True: _LEN.pack(len(_PING_BODY)) + _PING_BODY, False: _PING_BODY + b"\n"}
+
+def _vec3s(scene_objects, objs, attr):
+    # One C-side copy for all objects instead of a Vector -> list per object.
+    n = len(objs)
+    buf = np.empty(n * 3, dtype=np.float32)  # Blender stores transforms as float32
     try:
-        method = req.get("method")
-        params = req.get("params") or {}
+        if len(scene_objects) != n:
+            raise TypeError("filtered")  # foreach_get only works on the whole collection
+        scene_objects.foreach_get(attr, buf)
+    except (AttributeError, TypeError, RuntimeError):
+        buf[:] = np.fromiter((c for o in objs for c in getattr(o, attr)), dtype=np.float32, count=n * 3)
+    return buf.reshape(n, 3).tolist()
+
+def _world_observe():
+    scene = bpy.context.scene
+    scene_objects = scene.objects
+    objs = [o for o in scene_objects if o.type in _OBSERVED_TYPES]
+    if len(objs) < VECTORIZE_MIN_OBJECTS:
+        out = [
+            {
+                "name": o.name,
+                "type": o.type,
+                # [:] copies a Vector/Euler to a tuple in one C call; serialized as a JSON array
+                "location": o.location[:],
+                "rotation_euler": o.rotation_euler[:],
+                "scale": o.scale[:],
+            }
+            for o in objs
+        ]
+    else:
+        locs = _vec3s(scene_objects, objs, "location")
+        rots = _vec3s(scene_objects, objs, "rotation_euler")
+        scas = _vec3s(scene_objects, objs, "scale")
+        out = [
+            {"name": o.name, "type": o.type, "location": l, "rotation_euler": r, "scale": sc}
+            for o, l, r, sc in zip(objs, locs, rots, scas)
+        ]
+    return {"ok": True, "scene": scene.name, "object_count": len(out), "objects": out}
 
-        if method == "ping":
-            return {"ok": True, "pong": True, "blender": bpy.app.version_string}
-
-        if method == "world_reset":
-            # minimal reset: delete all objects
-            bpy.ops.object.select_all(action='SELECT')
-            bpy.ops.object.delete(use_global=False)
-            return {"ok": True, "object_count": len(bpy.data.objects)}
-
-        if method == "world_observe":
-            objs = []
-            for o in bpy.context.scene.objects:
-                if o.type in {"MESH", "EMPTY", "LIGHT", "CAMERA"}:
-                    objs.append({
-                        "name": o.name,
-                        "type": o.type,
-                        "location": list(o.location),
-                        "rotation_euler": list(o.rotation_euler),
-                        "scale": list(o.scale),
-                    })
-            return {"ok": True, "scene": bpy.context.scene.name, "object_count": len(objs), "objects": objs}
-
-        if method == "world_mutate":
-            dsl_version = params.get("dsl_version")
-            batch = params.get("batch") or []
-            applied = 0
-            errors = []
-            warnings = []
-
-            if dsl_version != "1.0":
-                return {
-                    "ok": False,
-                    "dsl_version": dsl_version,
-                    "applied": applied,
-                    "errors": [
-                        {
-                            "op": "world_mutate",
-                            "args": params,
-                            "error_type": "unsupported_dsl_version",
-                            "error_message": f"unsupported dsl_version {dsl_version}",
-                        }
-                    ],
-                    "warnings": warnings,
+# Windows sockets have no sendmsg; there the parts are joined and sent with sendall.
+_HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+
+def _send_parts(sock, parts):
+    """Send `parts` back to back as one gathered write, without concatenating them."""
+    if not _HAS_SENDMSG:
+        sock.sendall(b"".join(parts))
+        return
+    views = [memoryview(p) for p in parts]
+    while views:
+        sent = sock.sendmsg(views)
+        # drop what the kernel took; resume mid-buffer after a short write
+        while sent:
+            n = len(views[0])
+            if sent < n:
+                views[0] = views[0][sent:]
+                break
+            sent -= n
+            del views[0]
+
+def _json_reply(sock, obj, framed=False):
+    payload = _dumps(obj)
+    if framed:
+        _send_parts(sock, (_LEN.pack(len(payload)), payload))
+    else:
+        _send_parts(sock, (payload, b"\n"))
+
+def _op_ping(params):
+    return _PING_RESULT
+
+def _op_scene_version(params):
+    return {"ok": True, "scene_version": _scene_version}
+
+def _op_reset(params):
+    # minimal reset: delete all objects through the data API (no operator, context or undo step)
+    meshes = {obj.data.name: obj.data for obj in bpy.data.objects if obj.type == "MESH" and obj.data is not None}
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    # then only the meshes those objects used and nothing else uses; the rest of the user's
+    # data is left alone. _unit_cube() rebuilds the shared cube once it is gone.
+    for me in meshes.values():
+        if me.users == 0:
+            bpy.data.meshes.remove(me)
+    _bump_scene_version()
+    return {"ok": True, "object_count": len(bpy.data.objects)}
+
+def _op_observe(params):
+    return _world_observe()
+
+def _op_mutate(params):
+    global _view_layer_dirty
+    dsl_version = params.get("dsl_version")
+    batch = params.get("batch") or []
+    applied = 0
+    errors = []
+    warnings = []
+
+    if dsl_version != "1.0":
+        return {
+            "ok": False,
+            "dsl_version": dsl_version,
+            "applied": applied,
+            "errors": [
+                {
+                    "op": "world_mutate",
+                    "args": params,
+                    "error_type": "unsupported_dsl_version",
+                    "error_message": f"unsupported dsl_version {dsl_version}",
                 }
+            ],
+            "warnings": warnings,
+        }
 
-            for item in batch:
-                op = (item or {}).get("op")
-                args = (item or {}).get("args") or {}
-                try:
-                    if op == "add_cube":
-                        name = args.get("name")
-                        if not name:
-                            raise ValueError("name required")
-                        size = float(args.get("size", 1.0))
-                        location = args.get("location", [0.0, 0.0, 0.0])
-                        bpy.ops.mesh.primitive_cube_add(size=size, location=tuple(location))
-                        obj = bpy.context.active_object
-                        if obj is not None:
-                            obj.name = str(name)
-                        applied += 1
-                    elif op == "set_transform":
-                        name = args.get("name")
-                        if not name:
-                            raise ValueError("name required")
-                        obj = bpy.data.objects.get(str(name))
-                        if obj is None:
-                            raise ValueError(f"object not found: {name}")
-                        if "location" in args:
-                            loc = args.get("location")
-                            obj.location = loc
-                        if "rotation_euler" in args:
-                            rot = args.get("rotation_euler")
-                            obj.rotation_euler = rot
-                        if "scale" in args:
-                            sca = args.get("scale")
-                            obj.scale = sca
-                        applied += 1
-                    elif op == "delete_object":
-                        name = args.get("name")
-                        if not name:
-                            raise ValueError("name required")
-                        obj = bpy.data.objects.get(str(name))
-                        if obj is None:
-                            raise ValueError(f"object not found: {name}")
-                        bpy.data.objects.remove(obj, do_unlink=True)
-                        applied += 1
-                    else:
-                        raise ValueError(f"unknown op: {op}")
-                except Exception as e:
-                    errors.append(
-                        {
-                            "op": op,
-                            "args": args,
-                            "error_type": type(e).__name__,
-                            "error_message": str(e),
-                        }
-                    )
-
-            return {
-                "ok": len(errors) == 0,
-                "dsl_version": "1.0",
-                "applied": applied,
-                "errors": errors,
-                "warnings": warnings,
-            }
+    # name -> object for this batch, so repeated names cost one RNA lookup
+    name_cache = {}
+
+    def resolve(name):
+        obj = name_cache.get(name)
+        if obj is None:
+            obj = bpy.data.objects.get(name)
+            if obj is None:
+                raise ValueError(f"object not found: {name}")
+            name_cache[name] = obj
+        return obj
 
-        return {"ok": False, "error_type": "unknown_method", "error_message": f"Unknown method: {method}"}
+    # One undo-less batch: no undo step per op, one view layer update at the end.
+    edit_prefs = bpy.context.preferences.edit
+    prev_undo = edit_prefs.use_global_undo
+    edit_prefs.use_global_undo = False
+    try:
+        for item in batch:
+            op = (item or {}).get("op")
+            args = (item or {}).get("args") or {}
+            try:
+                if op == "add_cube":
+                    name = args.get("name")
+                    if not name:
+                        raise ValueError("name required")
+                    size = float(args.get("size", 1.0))
+                    location = args.get("location", [0.0, 0.0, 0.0])
+                    # data API instead of primitive_cube_add: no operator/context/undo per cube
+                    obj = bpy.data.objects.new(str(name), _unit_cube())
+                    bpy.context.scene.collection.objects.link(obj)
+                    obj.location = tuple(location)
+                    obj.scale = (size, size, size)
+                    name_cache[obj.name] = obj
+                    applied += 1
+                elif op == "set_transform":
+                    name = args.get("name")
+                    if not name:
+                        raise ValueError("name required")
+                    obj = resolve(str(name))
+                    if "location" in args:
+                        loc = args.get("location")
+                        obj.location = loc
+                    if "rotation_euler" in args:
+                        rot = args.get("rotation_euler")
+                        obj.rotation_euler = rot
+                    if "scale" in args:
+                        sca = args.get("scale")
+                        obj.scale = sca
+                    applied += 1
+                elif op == "delete_object":
+                    name = args.get("name")
+                    if not name:
+                        raise ValueError("name required")
+                    obj = resolve(str(name))
+                    name_cache.pop(obj.name, None)
+                    bpy.data.objects.remove(obj, do_unlink=True)
+                    applied += 1
+                else:
+                    raise ValueError(f"unknown op: {op}")
+            except Exception as e:
+                errors.append(
+                    {
+                        "op": op,
+                        "args": args,
+                        "error_type": type(e).__name__,
+                        "error_message": str(e),
+                    }
+                )
+    finally:
+        edit_prefs.use_global_undo = prev_undo
+
+    if applied:
+        _view_layer_dirty = True
+        _bump_scene_version()
+    return {
+        "ok": len(errors) == 0,
+        "dsl_version": "1.0",
+        "applied": applied,
+        "errors": errors,
+        "warnings": warnings,
+    }
+
+# method -> handler(params); one dict lookup per request instead of an if-chain
+_OPS = {
+    "ping": _op_ping,
+    "scene_version": _op_scene_version,
+    "world_reset": _op_reset,
+    "world_observe": _op_observe,
+    "world_mutate": _op_mutate,
+}
+
+def _handle_request(req):
+    try:
+        method = req.get("method")
+        params = req.get("params") or {}
+        handler = _OPS.get(method) if isinstance(method, str) else None
+        if handler is None:
+            return {"ok": False, "error_type": "unknown_method", "error_message": f"Unknown method: {method}"}
+        return handler(params)
 
+    except ValueError as e:
+        # validation errors: the message says it all, skip formatting a traceback
+        return {"ok": False, "error_type": type(e).__name__, "error_message": str(e)}
     except Exception as e:
+        frames = traceback.extract_tb(e.__traceback__, limit=5)
         return {
             "ok": False,
             "error_type": type(e).__name__,
             "error_message": str(e),
-            "trace": traceback.format_exc().splitlines()[:20],
+            "trace": "".join(traceback.format_list(frames)).splitlines(),
         }
 
-def _client_thread(conn, addr):
-    try:
-        buf = b""
-        while True:
-            chunk = conn.recv(4096)
-            if not chunk:
-                break
-            buf += chunk
-            while b"\n" in buf:
-                line, buf = buf.split(b"\n", 1)
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    req = json.loads(line.decode("utf-8"))
-                except Exception as e:
-                    _json_reply(conn, {"ok": False, "error_type": "json_parse", "error_message": str(e)})
-                    continue
-                resp = _handle_request(req)
-                _json_reply(conn, resp)
-    finally:
+_RECV_BUF_SIZE = 1 << 16
+
+def _recv_more(conn, buf, w):
+    """recv_into the free tail of `buf` (doubling it when full); returns bytes read."""
+    if w == len(buf):
+        buf.extend(bytes(len(buf)))  # a single message outgrew the buffer
+    return conn.recv_into(memoryview(buf)[w:])
+
+def _compact(buf, pos, w):
+    """Move the unconsumed residue buf[pos:w] to the front; returns its length."""
+    if pos:
+        buf[:w - pos] = buf[pos:w]
+    return w - pos
+
+def _submit(client, data):
+    req = resp = None
+    if data and data[0] == PING_TAG:
+        if not client.pending:
+            client.sock.sendall(_PING_REPLY[client.framed])
+            return
+        resp = _PING_RESULT  # an earlier reply is still due, so queue behind it
+    else:
+        try:
+            req = _loads(data)
+        except Exception as e:
+            # queued too, so replies on a connection keep request order
+            resp = {"ok": False, "error_type": "json_parse", "error_message": str(e)}
+    _requests.put((client, req, resp))
+    client.pending += 1
+
+def _drain_requests():
+    """bpy.app.timers callback: run everything queued since the last tick on the main thread."""
+    global _view_layer_dirty, _last_request_t
+    handled = 0
+    while True:
         try:
-            conn.close()
-        except Exception:
+            client, req, resp = _requests.get_nowait()
+        except queue.Empty:
+            break
+        handled += 1
+        if resp is None:
+            resp = _handle_request(req)
+        _replies.put((client, resp))
+    if handled:
+        try:
+            _wake_w.send(b"\0")
+        except BlockingIOError:
+            pass  # wakeups already pending
+    if _view_layer_dirty:
+        _view_layer_dirty = False
+        bpy.context.view_layer.update()
+    # stay hot while a client is streaming requests; back off once idle
+    now = time.monotonic()
+    if handled:
+        _last_request_t = now
+    return DRAIN_HOT_INTERVAL_S if now - _last_request_t < DRAIN_HOT_WINDOW_S else DRAIN_IDLE_INTERVAL_S
+
+def _consume_framed(client, buf, scan, w):
+    """Queue every complete length-prefixed request in buf[:w]; returns bytes consumed,
+    or None after rejecting an oversized frame (the connection must then be closed)."""
+    pos = 0
+    while w - pos >= _LEN.size:
+        (size,) = _LEN.unpack_from(buf, pos)
+        if size > MAX_FRAME_SIZE:
+            _json_reply(client.sock, {
+                "ok": False,
+                "error_type": "frame_too_large",
+                "error_message": f"frame of {size} bytes exceeds the {MAX_FRAME_SIZE} byte limit",
+            }, True)
+            return None
+        end = pos + _LEN.size + size
+        if end > w:
+            break
+        _submit(client, memoryview(buf)[pos + _LEN.size:end])
+        pos = end
+    return pos
+
+def _consume_lines(client, buf, scan, w):
+    """Queue every complete JSON line in buf[:w]; only buf[scan:w] can hold an unseen newline."""
+    pos = 0
+    while True:
+        nl = buf.find(b"\n", scan, w)
+        if nl < 0:
+            return pos
+        line = buf[pos:nl].strip()
+        if line:
+            _submit(client, line)
+        pos = scan = nl + 1
+
+class _Client:
+    """Per-connection receive state for the selector loop."""
+
+    __slots__ = ("sock", "buf", "w", "framed", "pending")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buf = bytearray(_RECV_BUF_SIZE)
+        self.w = 0
+        self.framed = None  # decided by the first byte received
+        self.pending = 0  # requests queued for the main thread, not yet answered
+
+    def on_readable(self):
+        """Receive what is available and queue complete requests; False once the connection should close."""
+        n = _recv_more(self.sock, self.buf, self.w)
+        if not n:
+            return False
+        scan, self.w = self.w, self.w + n
+        if self.framed is None:
+            self.framed = self.buf[0] == 0
+        consume = _consume_framed if self.framed else _consume_lines
+        pos = consume(self, self.buf, scan, self.w)
+        if pos is None:
+            return False
+        self.w = _compact(self.buf, pos, self.w)
+        return True
+
+def _send_replies():
+    """Socket thread: encode and send every response the main thread has finished."""
+    try:
+        while _wake_r.recv(4096):
             pass
+    except BlockingIOError:
+        pass
+    while True:
+        try:
+            client, resp = _replies.get_nowait()
+        except queue.Empty:
+            return
+        client.pending -= 1
+        try:
+            _json_reply(client.sock, resp, client.framed)
+        except Exception as e:
+            print(f"[Torr UI Bridge] reply failed: {e!r}")
+
+# Replies are sent blocking; a client that stops reading is dropped after this long.
+SEND_TIMEOUT_S = 10.0
+# Kernel buffers sized for large observe replies / mutate batches.
+SOCK_BUF_SIZE = 1 << 20
+
+_server_thread = None
+_stopping = False
+
+def _shutdown():
+    """Stop this run's drain timer and server thread (listening socket and clients)."""
+    global _stopping
+    if bpy.app.timers.is_registered(_drain_requests):
+        bpy.app.timers.unregister(_drain_requests)
+    _stopping = True
+    try:
+        _wake_w.send(b"\0")
+    except BlockingIOError:
+        pass  # wakeups already pending
+    if _server_thread is not None:
+        _server_thread.join(SEND_TIMEOUT_S)
+    print("[Torr UI Bridge] stopped")
 
 def start_server():
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # set before listen() so accepted sockets start with a matching TCP window
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF_SIZE)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF_SIZE)
     s.bind((HOST, PORT))
-    s.listen(5)
+    s.listen(64)
+    s.setblocking(False)
     print(f"[Torr UI Bridge] listening on {HOST}:{PORT}")
 
+    # One thread multiplexes every client; _drain_requests runs them on the main thread.
+    sel = selectors.DefaultSelector()
+    sel.register(s, selectors.EVENT_READ, None)
+    sel.register(_wake_r, selectors.EVENT_READ, None)
     while True:
-        conn, addr = s.accept()
-        t = threading.Thread(target=_client_thread, args=(conn, addr), daemon=True)
-        t.start()
+        for key, _events in sel.select():
+            if key.fileobj is _wake_r:
+                _send_replies()
+                if _stopping:
+                    for k in list(sel.get_map().values()):
+                        if k.fileobj is not _wake_r:
+                            k.fileobj.close()
+                    sel.close()
+                    return
+                continue
+            if key.data is None:
+                try:
+                    conn, _addr = s.accept()
+                except BlockingIOError:
+                    continue
+                conn.settimeout(SEND_TIMEOUT_S)
+                # small replies must not wait on Nagle for the client's delayed ACK
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF_SIZE)
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF_SIZE)
+                sel.register(conn, selectors.EVENT_READ, _Client(conn))
+                continue
+
+            client = key.data
+            try:
+                alive = client.on_readable()
+            except Exception as e:
+                print(f"[Torr UI Bridge] dropping client: {e!r}")
+                alive = False
+            if not alive:
+                sel.unregister(client.sock)
+                try:
+                    client.sock.close()
+                except Exception:
+                    pass
+
+# Re-running the script defines new functions, so the previous run's timer and server
+# thread can't be found by name; it leaves its _shutdown in bpy.app.driver_namespace.
+_prev_shutdown = bpy.app.driver_namespace.get("_torr_ui_bridge_shutdown")
+if _prev_shutdown is not None:
+    _prev_shutdown()
+bpy.app.driver_namespace["_torr_ui_bridge_shutdown"] = _shutdown
+
+_install_scene_version_handler()
+
+bpy.app.timers.register(_drain_requests, first_interval=0, persistent=True)
 
 # Start in background thread so Blender UI remains responsive
-threading.Thread(target=start_server, daemon=True).start()
+_server_thread = threading.Thread(target=start_server, daemon=True)
+_server_thread.start()
 print("[Torr UI Bridge] started")